@@ -0,0 +1,122 @@
+"""Micro-benchmark of a full refresh of all slot entities.
+
+Compares the refresh through the bound slot getters with the update before
+the entities were bound: every entity looked its key up in a plain values
+dict, which held the slot starts as ISO strings that the datetime entities
+parsed on every update. Both run on the same entities for the same number
+of rounds, and every round sees a new schedule.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_entity_refresh
+"""
+
+import datetime as dt
+import timeit
+from types import SimpleNamespace
+
+from homeassistant.util import dt as dt_utils
+
+from custom_components.energy_planner import datetime, number, select, switch
+from custom_components.energy_planner.const import DOMAIN, SLOT_COUNT
+from custom_components.energy_planner.slot_schedule import SlotValues, from_epoch
+
+ROUNDS = 200
+
+
+def _schedule(offset):
+    """Return a schedule of quarter hour slots starting offset slots later."""
+    start = dt_utils.now().replace(minute=0, second=0, microsecond=0)
+    return [
+        {
+            "start": start + dt.timedelta(minutes=15 * (i + offset)),
+            "end": start + dt.timedelta(minutes=15 * (i + offset + 1)),
+            "state": "charge" if (i + offset) % 2 else "pause",
+            "soc": 90,
+        }
+        for i in range(SLOT_COUNT - 1)
+    ]
+
+
+def _hass():
+    """Return a minimal hass object with a planned schedule."""
+    values = SlotValues.from_dict({})
+    values.slots.assign(0, _schedule(0))
+    return SimpleNamespace(
+        data={DOMAIN: {"values": values, "slots": values.slots, "config": {}}}
+    )
+
+
+def _entities(hass):
+    """Create the slot entities of all platforms."""
+    return [
+        platform.slot_entity(hass, i)
+        for platform in (datetime, number, select, switch)
+        for i in range(1, SLOT_COUNT + 1)
+    ]
+
+
+def _legacy_store(values):
+    """Return values as the plain dict of the old values store."""
+    store = values.as_dict()
+    for key, value in store.items():
+        if key.endswith("_date_time_start") and value is not None:
+            store[key] = from_epoch(value).isoformat()
+    return store
+
+
+def legacy_update(entity, hass):
+    """Update entity like the old update did, without the state write.
+
+    The old update looked its key up in the plain values store of hass and
+    parsed ISO slot starts.
+    """
+    entity._attr_available = True
+    value = hass.data[DOMAIN][entity.data_store].get(entity.id, None)
+    if type(value) is str:
+        value = dt_utils.parse_datetime(value)
+    entity._attr_native_value = value
+    if entity.platform_domain == "select":
+        entity._attr_current_option = value
+
+
+def main():
+    """Run the benchmark."""
+    hass = _hass()
+    values = hass.data[DOMAIN]["values"]
+    slots = hass.data[DOMAIN]["slots"]
+    entities = _entities(hass)
+    # Two schedules a slot apart, so every entity sees a new value each round
+    schedules = [_schedule(0), _schedule(1)]
+    stores = []
+    for schedule in schedules:
+        slots.assign(0, schedule)
+        stores.append(_legacy_store(values))
+    legacy_hass = SimpleNamespace(data={DOMAIN: {"values": stores[0]}})
+    rounds = iter(range(10**9))
+
+    def next_schedule():
+        i = next(rounds) % 2
+        slots.assign(0, schedules[i])
+        legacy_hass.data[DOMAIN]["values"] = stores[i]
+
+    def full_refresh():
+        for entity in entities:
+            entity.refresh()
+
+    def old_full_refresh():
+        for entity in entities:
+            legacy_update(entity, legacy_hass)
+
+    print(f"{len(entities)} entities, best of {ROUNDS} rounds")
+    # The schedule is switched between the rounds, outside the timing
+    for name, func in (
+        ("full refresh", full_refresh),
+        ("old refresh", old_full_refresh),
+    ):
+        best = min(timeit.repeat(func, setup=next_schedule, number=1, repeat=ROUNDS))
+        print(f"{name:>12}: {best * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark of parsing the timestamps of a Nord Pool day payload.
+
+Compares the ISO 8601 fast path of _parse_dt, with and without its cache
+filled, with the dateutil parser it falls back to.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_parse_dt
+"""
+
+import timeit
+
+from benchmarks.nordpool_payload import day_payload
+from custom_components.energy_planner.planner import nordpool_utils
+
+ROUNDS = 20
+
+
+def main():
+    """Run the benchmark."""
+    payload = day_payload()
+    # The old parse_json parsed both boundaries of every row for every area
+    strings = [
+        row[key]
+        for row in payload["multiAreaEntries"]
+        for _ in row["entryPerArea"]
+        for key in ("deliveryStart", "deliveryEnd")
+    ]
+    assert all(
+        nordpool_utils._parse_dt(s) == nordpool_utils._parse_dt_fallback(s)
+        for s in strings
+    )
+
+    def dateutil():
+        for s in strings:
+            nordpool_utils._parse_dt_fallback(s)
+
+    def cold():
+        nordpool_utils._parse_dt.cache_clear()
+        for s in strings:
+            nordpool_utils._parse_dt(s)
+
+    def warm():
+        for s in strings:
+            nordpool_utils._parse_dt(s)
+
+    print(f"{len(strings)} timestamps")
+    baseline = None
+    for name, func in (("dateutil", dateutil), ("cold cache", cold), ("warm", warm)):
+        best = min(timeit.repeat(func, number=1, repeat=ROUNDS))
+        baseline = baseline or best
+        print(f"{name:>10}: {best * 1e3:8.2f} ms ({baseline / best:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark of parsing a 20 area, 96 MTU Nord Pool day for one area.
+
+Compares parse_json_areas, which the price providers use, with the row
+dicts parse_json returned for the day cache: first going through every area
+of every row, then only through the requested areas. The timestamp caches
+are cleared every round, as for a newly fetched day.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_parse_json
+"""
+
+import timeit
+
+from benchmarks.nordpool_payload import day_payload
+from custom_components.energy_planner.planner import nordpool_utils
+from custom_components.energy_planner.planner.nordpool_utils import (
+    _conv_to_float,
+    _parse_dt,
+    parse_json_areas,
+)
+
+ROUNDS = 50
+AREA = "SE3"
+
+
+def legacy_parse_json(data, areas):
+    """Parse the areas of data the way parse_json used to."""
+    area_data = {}
+    for r in data["multiAreaEntries"]:
+        row_start_time = _parse_dt(r["deliveryStart"])
+        row_end_time = _parse_dt(r["deliveryEnd"])
+        for area_key in r["entryPerArea"]:
+            area_price = r["entryPerArea"][area_key]
+            if area_key not in areas:
+                continue
+            if area_key not in area_data:
+                area_data[area_key] = {"values": []}
+            area_data[area_key]["values"].append(
+                {
+                    "start": row_start_time,
+                    "end": row_end_time,
+                    "value": _conv_to_float(area_price),
+                }
+            )
+    return area_data
+
+
+def rows_parse_json(data, areas):
+    """Parse the areas of data into row dicts, looking up only those areas."""
+    area_data = {}
+    for r in data["multiAreaEntries"]:
+        entry_per_area = r["entryPerArea"]
+        row_start_time = None
+        for area_key in areas:
+            area_price = entry_per_area.get(area_key)
+            if area_price is None:
+                continue
+            if row_start_time is None:
+                row_start_time = _parse_dt(r["deliveryStart"])
+                row_end_time = _parse_dt(r["deliveryEnd"])
+            if area_key not in area_data:
+                area_data[area_key] = {"values": []}
+            area_data[area_key]["values"].append(
+                {
+                    "start": row_start_time,
+                    "end": row_end_time,
+                    "value": _conv_to_float(area_price),
+                }
+            )
+    return area_data
+
+
+def main():
+    """Run the benchmark."""
+    payload = day_payload()
+    rows = rows_parse_json(payload, [AREA])
+    assert legacy_parse_json(payload, [AREA]) == rows
+    assert [v["value"] for v in rows[AREA]["values"]] == list(
+        parse_json_areas(payload, [AREA])[AREA].values
+    )
+
+    def run(func):
+        def timed():
+            # Parse the timestamps every round, as for a newly fetched day
+            nordpool_utils._parse_dt.cache_clear()
+            func()
+
+        return timed
+
+    baseline = None
+    for name, func in (
+        ("legacy", lambda: legacy_parse_json(payload, [AREA])),
+        ("rows", lambda: rows_parse_json(payload, [AREA])),
+        ("series", lambda: parse_json_areas(payload, [AREA])),
+    ):
+        best = min(timeit.repeat(run(func), number=1, repeat=ROUNDS))
+        baseline = baseline or best
+        print(f"{name:>10}: {best * 1e3:8.3f} ms ({baseline / best:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Synthetic Nord Pool API responses for the benchmarks."""
+
+import datetime as dt
+import random
+
+AREAS = [
+    "DK1",
+    "DK2",
+    "FI",
+    "EE",
+    "LT",
+    "LV",
+    "NO1",
+    "NO2",
+    "NO3",
+    "NO4",
+    "NO5",
+    "SE1",
+    "SE2",
+    "SE3",
+    "SE4",
+    "SYS",
+    "FR",
+    "NL",
+    "BE",
+    "AT",
+]
+
+
+def day_payload(date=dt.date(2025, 1, 15), areas=AREAS, mtus=96):
+    """Return a response of the Nord Pool API for a day of all areas."""
+    start = dt.datetime.combine(date, dt.time(), dt.UTC) - dt.timedelta(hours=1)
+    resolution = dt.timedelta(days=1) / mtus
+    rng = random.Random(date.toordinal())
+
+    def iso(time):
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    return {
+        "deliveryDateCET": date.isoformat(),
+        "version": 1,
+        "updatedAt": iso(start - dt.timedelta(hours=10)),
+        "currency": "SEK",
+        "multiAreaEntries": [
+            {
+                "deliveryStart": iso(start + i * resolution),
+                "deliveryEnd": iso(start + (i + 1) * resolution),
+                "entryPerArea": {
+                    area: round(rng.uniform(-100, 3000), 2) for area in areas
+                },
+            }
+            for i in range(mtus)
+        ],
+    }
@@ -1,6 +1,9 @@
+import asyncio
+from functools import partial
 import logging
+import os
 import datetime as dt
-from zoneinfo import ZoneInfo
+import time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import (
@@ -14,9 +17,10 @@ from homeassistant.const import Platform
 from homeassistant.exceptions import ServiceValidationError
 
 # from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.event import (
+    async_track_state_change_event,
     async_track_utc_time_change,
-    async_track_time_interval,
 )
 
 from .const import (
@@ -26,6 +30,10 @@ from .const import (
     SWITCH_ENTITIES,
     SENSOR_ENTITIES,
     SELECT_ENTITIES,
+    PLANNER_DEBOUNCE,
+    PLANNER_FALLBACK_HOUR,
+    PRICE_DIRECTORY,
+    STARTUP_TIME_BUDGET,
     TIME_ENTITIES,
 )
 from .planner import (
@@ -33,12 +41,25 @@ from .planner import (
     dynamic_planner,
     cheapest_hours_planner,
     add_manual_slots,
-    clear_passed_slots,
+    arm_slot_timer,
+    cancel_slot_timer,
     update_entities,
     price_peak_planner,
 )
-from .store import async_save_to_store, async_load_from_store
-from .utils import tz_diff
+from .planner.price_archive import PriceArchive
+from .planner.nordpool_utils import forget_failures
+from .planner.price_cache import PriceCache
+from .planner.price_provider import FileProvider, NordpoolProvider
+from .schema import (
+    decode_config,
+    decode_manual_slots,
+    decode_values,
+    encode_config,
+    encode_manual_slots,
+    encode_values,
+)
+from .store import StoreManager
+from .utils import LOCAL_ZONE, get_zone
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS = [
@@ -55,11 +76,31 @@ async def async_setup_data_structure(hass: HomeAssistant):
     """Set up the data structure."""
 
     async def save():
-        for data_store in ["values", "config", "manual_slots"]:
-            await async_save_to_store(hass, data_store, hass.data[DOMAIN][data_store])
+        persistence = hass.data[DOMAIN]["persistence"]
+        persistence.async_schedule_save(
+            "values", lambda: encode_values(hass.data[DOMAIN]["values"])
+        )
+        persistence.async_schedule_save(
+            "config", lambda: encode_config(hass.data[DOMAIN]["config"])
+        )
+        persistence.async_schedule_save(
+            "manual_slots",
+            lambda: encode_manual_slots(hass.data[DOMAIN]["manual_slots"]),
+        )
+        # Every schedule change is saved, keep the slot timer and the schedule
+        # sensor in sync with it
+        arm_slot_timer(hass)
+        for sensor in hass.data[DOMAIN][SENSOR_ENTITIES]:
+            if sensor.refresh() and sensor.is_added_to_hass:
+                sensor.async_write_ha_state()
+                hass.data[DOMAIN]["stats"]["state_writes"] += 1
 
+    started = time.monotonic()
+    persistence = StoreManager(hass)
     hass.data[DOMAIN] = {
         "values": {},
+        "slots": None,
+        "slot_timer": None,
         "config": {},
         "manual_slots": [],
         DATE_TIME_ENTITIES: {},
@@ -69,13 +110,61 @@ async def async_setup_data_structure(hass: HomeAssistant):
         SENSOR_ENTITIES: {},
         SELECT_ENTITIES: {},
         "save": save,
+        "persistence": persistence,
         "listeners": [],
+        "slot_platforms": {},
+        "nordpool_fetches": {},
+        "nordpool_failures": {},
+        "price_providers": [NordpoolProvider()],
+        "planner_debouncer": None,
+        "planned_for": None,
+        "price_cache": None,
+        "price_archive": PriceArchive(
+            hass.config.path(".storage", "energy_planner.price_archive")
+        ),
+        "stats": {
+            "state_writes": 0,
+            "suppressed_writes": 0,
+            "startup_started": started,
+        },
     }
-    hass.data[DOMAIN]["values"] = await async_load_from_store(hass, "values")
-    hass.data[DOMAIN]["config"] = await async_load_from_store(hass, "config")
-    hass.data[DOMAIN]["manual_slots"] = (
-        await async_load_from_store(hass, "manual_slots") or []
+    values, config, manual_slots, price_cache = await asyncio.gather(
+        persistence.async_load("values"),
+        persistence.async_load("config"),
+        persistence.async_load("manual_slots"),
+        persistence.async_load("price_cache"),
     )
+    # Stored data is decoded once here, and encoded again in save()
+    values = decode_values(values)
+    hass.data[DOMAIN]["values"] = values
+    hass.data[DOMAIN]["slots"] = values.slots
+    hass.data[DOMAIN]["config"] = decode_config(config)
+    hass.data[DOMAIN]["manual_slots"] = decode_manual_slots(manual_slots or [])
+    # The price cache is saved by the Nord Pool fetches, not by save()
+    hass.data[DOMAIN]["price_cache"] = PriceCache.from_dict(price_cache)
+    price_directory = hass.config.path(PRICE_DIRECTORY)
+    if await hass.async_add_executor_job(os.path.isdir, price_directory):
+        _LOGGER.info("Falling back on the prices in %s", price_directory)
+        hass.data[DOMAIN]["price_providers"].append(FileProvider(price_directory))
+    _LOGGER.debug("Loaded stores in %.3f s", time.monotonic() - started)
+
+
+async def async_setup_platforms(hass: HomeAssistant, entry: ConfigEntry):
+    """Set up the platforms and publish the first states in one batch."""
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # The platforms add their entities with the stored states, only publish
+    # what changed while they were being set up
+    await update_entities(hass, config=True)
+    stats = hass.data[DOMAIN]["stats"]
+    stats["startup_time"] = time.monotonic() - stats["startup_started"]
+    if stats["startup_time"] > STARTUP_TIME_BUDGET:
+        _LOGGER.warning(
+            "Started in %.3f s, over the budget of %.1f s",
+            stats["startup_time"],
+            STARTUP_TIME_BUDGET,
+        )
+    else:
+        _LOGGER.info("Started in %.3f s", stats["startup_time"])
 
 
 async def async_setup(hass: HomeAssistant, config):
@@ -94,9 +183,9 @@ async def async_setup(hass: HomeAssistant, config):
         """Service to add a slot."""
         try:
             start_datetime = dt.datetime.fromisoformat(call.data.get("start"))
-            start_datetime = start_datetime.replace(tzinfo=ZoneInfo("Europe/Stockholm"))
+            start_datetime = start_datetime.replace(tzinfo=get_zone(LOCAL_ZONE))
             end_datetime = dt.datetime.fromisoformat(call.data.get("end"))
-            end_datetime = end_datetime.replace(tzinfo=ZoneInfo("Europe/Stockholm"))
+            end_datetime = end_datetime.replace(tzinfo=get_zone(LOCAL_ZONE))
             state = call.data.get("state")
             soc = call.data.get("soc")
             if start_datetime > end_datetime:
@@ -163,34 +252,61 @@ async def async_setup(hass: HomeAssistant, config):
         hass.data[DOMAIN]["manual_slots"] = []
         await hass.data[DOMAIN]["save"]()
 
+    @callback
+    async def import_prices_service(call: ServiceCall) -> None:
+        """Service to import a price export into the price archive."""
+        path = call.data.get("path")
+        if not path or not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"Path {path} is not allowed")
+        area = str(call.data.get("area")).upper()
+        currency = str(call.data.get("currency")).upper()
+        try:
+            count = await hass.async_add_executor_job(
+                hass.data[DOMAIN]["price_archive"].import_file, area, currency, path
+            )
+        except (OSError, ValueError) as e:
+            _LOGGER.error("Error importing prices from %s: %s", path, e)
+            raise ServiceValidationError("Invalid price export") from e
+        _LOGGER.info("Imported %s prices of %s %s from %s", count, area, currency, path)
+
     # Register our service with Home Assistant.
     hass.services.async_register(DOMAIN, "add_slot", add_slot_service)
     hass.services.async_register(DOMAIN, "run_planner", run_planner_service)
     hass.services.async_register(
         DOMAIN, "clear_manual_slots", clear_manual_slots_service
     )
+    hass.services.async_register(DOMAIN, "import_prices", import_prices_service)
 
-    update_schedule_timer = async_track_utc_time_change(
+    # Planning starts when tomorrow's prices are published, see
+    # async_setup_entry. Nord Pool updates in a burst are planned once.
+    debouncer = Debouncer(
         hass,
-        run_planner,
-        hour=(15 + int(tz_diff("Europe/Stockholm", "UTC"))) % 24,
-        minute=31,
-        second=15,
+        _LOGGER,
+        cooldown=PLANNER_DEBOUNCE,
+        immediate=False,
+        function=run_planner,
     )
-    hass.data[DOMAIN]["listeners"].append(update_schedule_timer)
+    hass.data[DOMAIN]["planner_debouncer"] = debouncer
+    hass.data[DOMAIN]["listeners"].append(debouncer.async_cancel)
 
     @callback
-    async def check_schedule(*args, **kwargs):
-        _LOGGER.info("Checking schedule args, %s", args)
-        _LOGGER.info("Checking schedule kwargs, %s", kwargs)
-        await clear_passed_slots(hass)
+    def fallback_planner(now: dt.datetime) -> None:
+        """Run the planner if tomorrow's prices are late."""
+        local = now.astimezone(get_zone(LOCAL_ZONE))
+        if local.hour != PLANNER_FALLBACK_HOUR:
+            return
+        if hass.data[DOMAIN]["planned_for"] == local.date() + dt.timedelta(days=1):
+            return
+        _LOGGER.info("Tomorrow's prices are not published, running planner")
+        debouncer.async_schedule_call()
 
-    check_schedule_timer = async_track_time_interval(
-        hass,
-        check_schedule,
-        dt.timedelta(minutes=1),
+    # Checked every hour, the local hour is right whatever the UTC offset
+    hass.data[DOMAIN]["listeners"].append(
+        async_track_utc_time_change(hass, fallback_planner, minute=31, second=15)
     )
-    hass.data[DOMAIN]["listeners"].append(check_schedule_timer)
+
+    arm_slot_timer(hass)
+    hass.data[DOMAIN]["listeners"].append(lambda: cancel_slot_timer(hass))
     # Return boolean to indicate that initialization was successful.
     return True
 
@@ -200,6 +316,23 @@ async def state_automation_listener(event: Event[EventStateChangedData]):
     _LOGGER.debug(f"state_automation_listener: {event.data}")
 
 
+@callback
+def nordpool_state_listener(hass: HomeAssistant, event: Event[EventStateChangedData]):
+    """Plan when tomorrow's prices are published."""
+    old_state = event.data["old_state"]
+    new_state = event.data["new_state"]
+    if new_state is None or not new_state.attributes.get("tomorrow_valid"):
+        return
+    if old_state is not None and old_state.attributes.get("tomorrow_valid"):
+        return
+    tomorrow = dt.datetime.now(get_zone(LOCAL_ZONE)).date() + dt.timedelta(days=1)
+    _LOGGER.info("Prices for %s published, running planner", tomorrow)
+    # A run before the publication may have cached tomorrow as unpublished.
+    # The planner sets planned_for once a run had tomorrow's prices.
+    forget_failures(hass, tomorrow.isoformat())
+    hass.data[DOMAIN]["planner_debouncer"].async_schedule_call()
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Modbus from a config entry."""
     # Set up the platforms associated with this integration
@@ -207,9 +340,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         await async_setup_data_structure(hass)
     hass.data[DOMAIN]["config"]["entry_id"] = entry.entry_id
     hass.data[DOMAIN]["config"]["nordpool_entity_id"] = entry.data["nordpool_entity_id"]
-    hass.async_create_task(
-        hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    hass.data[DOMAIN]["listeners"].append(
+        async_track_state_change_event(
+            hass,
+            entry.data["nordpool_entity_id"],
+            partial(nordpool_state_listener, hass),
+        )
     )
+    hass.async_create_task(async_setup_platforms(hass, entry))
     return True
 
 
@@ -221,4 +359,5 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     if unload_ok:
         for listener in hass.data[DOMAIN]["listeners"]:
             listener()
+        await hass.data[DOMAIN]["persistence"].async_flush()
     return unload_ok
@@ -7,4 +7,36 @@ DATE_TIME_ENTITIES = "date_time_entities"
 TIME_ENTITIES = "time_entities"
 SELECT_ENTITIES = "select_entities"
 
-VERSION_STORAGE = "1"
+VERSION_STORAGE = "2"
+
+SLOT_COUNT = 49
+# Extra slot entities registered beyond the used slots with lazy_slot_entities
+SLOT_HEADROOM = 4
+SLOT_STATES = (
+    "off",
+    "charge",
+    "discharge",
+    "sell",
+    "sell-excess",
+    "discard-excess",
+    "pause",
+)
+# Seconds the integration may take to start before a warning is logged
+STARTUP_TIME_BUDGET = 2.0
+# Days before today the fetched Nord Pool days are kept, planning reads two
+PRICE_CACHE_RETENTION_DAYS = 2
+# Most Nord Pool days kept, the oldest are evicted first
+PRICE_CACHE_MAX_DAYS = 64
+# Seconds a Nord Pool service call may take before it is cancelled
+NORDPOOL_FETCH_TIMEOUT = 10
+# Seconds before a failed Nord Pool day is fetched again, doubled per failure
+NORDPOOL_RETRY_DELAY = 60
+NORDPOOL_RETRY_MAX_DELAY = 3600
+# Seconds before a Nord Pool day that was not published yet is fetched again
+NORDPOOL_UNPUBLISHED_TTL = 900
+# Seconds to wait for more Nord Pool updates before planning on new prices
+PLANNER_DEBOUNCE = 10
+# Local hour the planner runs if tomorrow's prices have not been published
+PLANNER_FALLBACK_HOUR = 15
+# Directory in the config directory with price exports to fall back on
+PRICE_DIRECTORY = "energy_planner_prices"
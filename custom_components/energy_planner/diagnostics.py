@@ -0,0 +1,20 @@
+"""Diagnostics of the Energy Planner integration."""
+
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.energy_planner.const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return the counters of the integration and its price cache."""
+    data = hass.data[DOMAIN]
+    return {
+        "stats": dict(data["stats"]),
+        "price_cache": data["price_cache"].stats(),
+        "nordpool_failures": len(data["nordpool_failures"]),
+    }
@@ -0,0 +1,86 @@
+import logging
+from abc import abstractmethod
+
+from homeassistant.helpers.entity import Entity
+
+from custom_components.energy_planner.const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EnergyPlannerEntity(Entity):
+    """Common base of the Energy Planner entities.
+
+    Entities of a slot bind to the getter and setter of their field in the
+    slot schedule when created, so reading or writing their value is a
+    single call instead of looking up the store and the key.
+    """
+
+    platform_domain = None
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_available = True
+
+    def __init__(self, hass, entity_definition):
+        """Initialize the entity."""
+        self._hass = hass
+        self.id = entity_definition["id"]
+
+        self.entity_id = f"{self.platform_domain}.{DOMAIN}_{self.id}"
+        self._attr_unique_id = f"{DOMAIN}_{self.id}"
+        self._attr_name = entity_definition["name"]
+        self.data_store = entity_definition.get("data_store", "values")
+        self.default = entity_definition.get("default", None)
+        self._attr_assumed_state = entity_definition.get("assumed", False)
+        self.is_added_to_hass = False
+        self._attr_device_class = entity_definition.get("device_class", None)
+        self._attr_icon = entity_definition.get("icon", None)
+        self._attr_entity_registry_enabled_default = entity_definition.get(
+            "enabled", False
+        )
+        binding = None
+        if self.data_store == "values":
+            binding = hass.data[DOMAIN]["values"].binding(self.id)
+        if binding is None:
+            self._slot_get = self._slot_set = self.slot_index = None
+        else:
+            self._slot_get, self._slot_set, self.slot_index = binding
+
+    async def async_added_to_hass(self) -> None:
+        """Run when entity about to be added to hass."""
+        await super().async_added_to_hass()
+        self.is_added_to_hass = True
+
+    def stored_value(self):
+        """Return the value of the entity in its data store."""
+        if self._slot_get is not None:
+            return self._slot_get(self.slot_index)
+        return self._hass.data[DOMAIN][self.data_store].get(self.id, None)
+
+    def store_value(self, value):
+        """Set the value of the entity in its data store."""
+        if self._slot_set is not None:
+            self._slot_set(self.slot_index, value)
+            return
+        self._hass.data[DOMAIN][self.data_store][self.id] = value
+
+    @abstractmethod
+    def refresh(self) -> bool:
+        """Read the stored value, return whether it changed."""
+
+    def update(self):
+        """Update data."""
+        self.refresh()
+        self.schedule_update_ha_state()
+
+
+def prepare_entities(entities):
+    """Seed missing stored values with the defaults and read the stored values.
+
+    Done in a single pass before the entities are added, so the state Home
+    Assistant writes when adding them already is the stored one.
+    """
+    for entity in entities:
+        if entity.default is not None and entity.stored_value() is None:
+            entity.store_value(entity.default)
+        entity.refresh()
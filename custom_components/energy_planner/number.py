@@ -14,31 +14,41 @@ from homeassistant.components.sensor.const import (
 )
 
 from custom_components.energy_planner.const import DOMAIN, NUMBER_ENTITIES
+from custom_components.energy_planner.entity import (
+    EnergyPlannerEntity,
+    prepare_entities,
+)
+from custom_components.energy_planner.slot_entities import (
+    register_slot_platform,
+    slot_entity_count,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def slot_entity(hass, i):
+    """Create the number entity of slot i."""
+    return EnergyPlannerNumberEntity(
+        hass,
+        {
+            "id": f"slot_{i}_soc",
+            "name": f"Slot {i} soc",
+            "default": 50,
+            "min_val": 0,
+            "max_val": 100,
+            "step": 1,
+            "unit_of_measurement": PERCENTAGE,
+            "enabled": True,
+            "data_store": "values",
+        },
+    )
+
+
 async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_devices):
     """Set up the number platform."""
     _LOGGER.info("Setting up number platform")
     numbers = [
-        *[
-            EnergyPlannerNumberEntity(
-                hass,
-                {
-                    "id": f"slot_{i}_soc",
-                    "name": f"Slot {i} soc",
-                    "default": 50,
-                    "min_val": 0,
-                    "max_val": 100,
-                    "step": 1,
-                    "unit_of_measurement": PERCENTAGE,
-                    "enabled": True,
-                    "data_store": "values",
-                },
-            )
-            for i in range(1, 50)
-        ],
+        *[slot_entity(hass, i) for i in range(1, slot_entity_count(hass) + 1)],
         EnergyPlannerNumberEntity(
             hass,
             {
@@ -228,39 +238,23 @@ async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_devices):
     ]
 
     hass.data[DOMAIN][NUMBER_ENTITIES] = numbers
-    for number in numbers:
-        if hass.data[DOMAIN][number.data_store].get(number.id) is None:
-            hass.data[DOMAIN][number.data_store][number.id] = number.native_value
+    register_slot_platform(hass, NUMBER_ENTITIES, slot_entity, async_add_devices)
+    prepare_entities(numbers)
     async_add_devices(numbers)
-    for number in numbers:
-        number.update()
-
     # Return boolean to indicate that initialization was successful
     return True
 
 
-class EnergyPlannerNumberEntity(NumberEntity):
+class EnergyPlannerNumberEntity(EnergyPlannerEntity, NumberEntity):
     """Representation of a Number entity."""
 
+    platform_domain = "number"
+
     def __init__(self, hass, entity_definition):
         """Initialize the Number entity."""
-        #
-        # Visible Instance Attributes Outside Class
-        self._hass = hass
-        self.id = entity_definition["id"]
-        # Hidden Inherited Instance Attributes
-        self._attr_unique_id = "{}_{}".format(DOMAIN, self.id)
-        self.entity_id = f"number.{DOMAIN}_{self.id}"
-        self._attr_has_entity_name = True
-        self._attr_name = entity_definition["name"]
-        self.data_store = entity_definition.get("data_store", "values")
+        super().__init__(hass, entity_definition)
         self._attr_native_value = entity_definition.get("default", None)
-        self._attr_assumed_state = entity_definition.get("assumed", False)
-        self._attr_available = True
-        self.is_added_to_hass = False
-        self._attr_device_class = entity_definition.get("device_class", None)
         self._attr_state_class = entity_definition.get("state_class", None)
-        self._attr_icon = entity_definition.get("icon", None)
         self._attr_mode = entity_definition.get("mode", NumberMode.AUTO)
         self._attr_native_unit_of_measurement = entity_definition.get(
             "unit_of_measurement", None
@@ -268,27 +262,18 @@ class EnergyPlannerNumberEntity(NumberEntity):
         self._attr_native_min_value = entity_definition.get("min_val", None)
         self._attr_native_max_value = entity_definition.get("max_val", None)
         self._attr_native_step = entity_definition.get("step", 1.0)
-        self._attr_should_poll = False
-        self._attr_entity_registry_enabled_default = entity_definition.get(
-            "enabled", False
-        )
-
-    async def async_added_to_hass(self) -> None:
-        """Run when entity about to be added to hass."""
-        await super().async_added_to_hass()
-        self.is_added_to_hass = True
 
-    def update(self):
-        """Update data."""
-        self._attr_available = True
-
-        value = self._hass.data[DOMAIN][self.data_store].get(self.id, None)
+    def refresh(self) -> bool:
+        """Read the stored value, return whether it changed."""
+        value = self.stored_value()
+        if value == self._attr_native_value:
+            return False
         self._attr_native_value = value
-        self.schedule_update_ha_state()
+        return True
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
         self._attr_native_value = value
-        self._hass.data[DOMAIN][self.data_store][self.id] = value
+        self.store_value(value)
         await self._hass.data[DOMAIN]["save"]()
         self.schedule_update_ha_state()
@@ -2,12 +2,19 @@ from .basic_planner import planner as basic_planner
 from .dynamic_planner import planner as dynamic_planner
 from .cheapest_hours_planner import planner as cheapest_hours_planner
 from .manual_slots import add_manual_slots
-from .utils import clear_passed_slots, update_entities
+from .utils import (
+    arm_slot_timer,
+    cancel_slot_timer,
+    clear_passed_slots,
+    update_entities,
+)
 from .price_peak_planner import planner as price_peak_planner
 
 __all__ = [
     "add_manual_slots",
+    "arm_slot_timer",
     "basic_planner",
+    "cancel_slot_timer",
     "cheapest_hours_planner",
     "clear_passed_slots",
     "dynamic_planner",
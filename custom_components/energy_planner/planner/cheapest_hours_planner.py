@@ -5,30 +5,34 @@ from homeassistant.core import HomeAssistant
 
 from .utils import (
     reset,
-    parse_datetime,
+    set_planned_for,
     update_entities,
     store_disable_state,
     restore_disable_state,
 )
 from .manual_slots import add_manual_slots
 from .. import DOMAIN
-from .nordpool_utils import fetch_nordpool_data, tzs
+from ..utils import day_boundary
+from .nordpool_utils import (
+    async_get_area_zone,
+    fetch_nordpool_data,
+    nordpool_area_currency,
+)
+from .price_series import PriceSeries
 
 from homeassistant.util import dt as dt_utils
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def plan_day(hass: HomeAssistant, nordpool_values: [dict], config: dict):
+async def plan_day(hass: HomeAssistant, nordpool_values: PriceSeries, config: dict):
     """Plan day."""
     _LOGGER.info("plan_day: %s", nordpool_values)
 
-    cheapest_hours = sorted(
-        sorted(nordpool_values, key=lambda x: x["value"])[
-            : int(config["nr_of_charge_hours"] * 4)
-        ],
-        key=lambda x: x["start"],
-    )
+    cheapest_hours = [
+        {"start": nordpool_values.start(i), "end": nordpool_values.end(i)}
+        for i in nordpool_values.lowest(int(config["nr_of_charge_hours"] * 4))
+    ]
     max_soc = hass.data[DOMAIN]["config"].get("battery_max_soc", 100)
     min_soc = hass.data[DOMAIN]["config"].get("battery_shutdown_soc", 20)
     # combine neighbouring hours
@@ -73,22 +77,8 @@ async def plan_day(hass: HomeAssistant, nordpool_values: [dict], config: dict):
     # remove past hours
     schedule = [x for x in schedule if x["end"] > now]
     _LOGGER.info("schedule: %s", schedule)
-    index = 1
-    while True:
-        if hass.data[DOMAIN]["values"][f"slot_{index}_state"] == "off":
-            break
-        index += 1
-    for i, slot in enumerate(schedule):
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_date_time_start"] = slot["start"]
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_state"] = slot["state"]
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_active"] = True
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_soc"] = slot["soc"]
-    if len(schedule) > 0:
-        hass.data[DOMAIN]["values"][f"slot_{index + len(schedule)}_date_time_start"] = (
-            schedule[-1]["end"]
-        )
-        hass.data[DOMAIN]["values"][f"slot_{index + len(schedule)}_state"] = "off"
-        hass.data[DOMAIN]["values"][f"slot_{index + len(schedule)}_active"] = False
+    slots = hass.data[DOMAIN]["slots"]
+    slots.assign(slots.first_off(), schedule)
 
 
 async def planner(hass: HomeAssistant, *args, **kwargs):
@@ -96,8 +86,7 @@ async def planner(hass: HomeAssistant, *args, **kwargs):
     nordpool_entity_id = hass.data[DOMAIN]["config"].get("nordpool_entity_id")
     if nordpool_entity_id is None:
         raise ValueError("Nordpool entity not set")
-    nordpool_currency = str(nordpool_entity_id.split("_")[3]).upper()
-    nordpool_area = str(nordpool_entity_id.split("_")[2]).upper()
+    nordpool_area, nordpool_currency = nordpool_area_currency(nordpool_entity_id)
 
     nordpool_state = hass.states.get(nordpool_entity_id)
     if nordpool_state is None:
@@ -106,10 +95,15 @@ async def planner(hass: HomeAssistant, *args, **kwargs):
     _LOGGER.info("Running planner")
 
     tomorrow_valid = attributes.get("tomorrow_valid")
-    yesterday, today, tomorrow = await fetch_nordpool_data(
-        hass, nordpool_currency, nordpool_area, tomorrow_valid
+    prices = await fetch_nordpool_data(
+        hass,
+        nordpool_currency,
+        nordpool_area,
+        tomorrow_valid,
+        attributes,
+        include_yesterday=False,
     )
-    if yesterday is None or today is None:
+    if len(prices) == 0:
         raise ValueError("Nordpool data not found")
     nr_of_charge_hours = float(
         hass.data[DOMAIN]["config"].get("cheapest_hours_nr_of_charge_hours")
@@ -117,64 +111,31 @@ async def planner(hass: HomeAssistant, *args, **kwargs):
     await store_disable_state(hass)
     await reset(hass)
     now = dt_utils.now()
-    zone = tzs.get(nordpool_area)
+    zone = await async_get_area_zone(nordpool_area)
     if zone is None:
         _LOGGER.debug("Failed to get timezone for %s", nordpool_area)
         return
-    zone = await dt_utils.async_get_time_zone(zone)
-    start_of_day = now.astimezone(zone).replace(
-        hour=0,
-        minute=0,
-        second=0,
-        microsecond=0,
-    )
+    today = now.astimezone(zone).date()
+    start_of_day = day_boundary(zone, today)
     config = {
         "start_of_day": start_of_day,
         "nr_of_charge_hours": nr_of_charge_hours,
     }
-    today_data = [
-        {
-            "start": parse_datetime(x["start"], zone),
-            "end": parse_datetime(x["end"], zone),
-            "value": x["value"],
-        }
-        for x in [*yesterday, *today]
-        if start_of_day
-        <= parse_datetime(x["start"], zone)
-        < start_of_day + dt.timedelta(days=1)
-    ]
+    today_data = prices.window(start_of_day, start_of_day + dt.timedelta(days=1))
 
     await plan_day(hass, today_data, config)
 
-    if tomorrow is not None:
-        start_of_day = (
-            (now + dt.timedelta(days=1))
-            .astimezone(zone)
-            .replace(
-                hour=0,
-                minute=0,
-                second=0,
-                microsecond=0,
-            )
-        )
+    if tomorrow_valid:
+        start_of_day = day_boundary(zone, today + dt.timedelta(days=1))
 
         config = {
             "start_of_day": start_of_day,
             "nr_of_charge_hours": nr_of_charge_hours,
         }
-        tomorrow_data = [
-            {
-                "start": parse_datetime(x["start"], zone),
-                "end": parse_datetime(x["end"], zone),
-                "value": x["value"],
-            }
-            for x in [*today, *tomorrow]
-            if start_of_day
-            <= parse_datetime(x["start"], zone)
-            < start_of_day + dt.timedelta(days=1)
-        ]
+        tomorrow_data = prices.window(start_of_day, start_of_day + dt.timedelta(days=1))
         await plan_day(hass, tomorrow_data, config)
     await add_manual_slots(hass)
     await restore_disable_state(hass)
     await update_entities(hass)
     await hass.data[DOMAIN]["save"]()
+    set_planned_for(hass, prices)
@@ -1,14 +1,27 @@
 # Heavily based on https://github.com/custom-components/nordpool/blob/master/custom_components/nordpool/aio_price.py
+import asyncio
 import logging
+import time
+from array import array
 
-from datetime import datetime
+from datetime import UTC, datetime
 from datetime import timedelta
+from functools import lru_cache
+from operator import itemgetter
 from dateutil.parser import parse as parse_dt
 from pytz import timezone, utc
 from homeassistant.util import dt as dt_utils
 from homeassistant.core import HomeAssistant
 
-from ..const import DOMAIN
+from ..const import (
+    DOMAIN,
+    NORDPOOL_FETCH_TIMEOUT,
+    NORDPOOL_RETRY_DELAY,
+    NORDPOOL_RETRY_MAX_DELAY,
+    NORDPOOL_UNPUBLISHED_TTL,
+)
+from ..utils import async_get_zone, day_boundary
+from .price_series import DEFAULT_RESOLUTION, DailyPrices, PriceSeries
 
 _LOGGER = logging.getLogger(__name__)
 tzs = {
@@ -37,7 +50,15 @@ tzs = {
 }
 
 
-def _parse_dt(time_str):
+async def async_get_area_zone(nordpool_area):
+    """Return the timezone of a Nord Pool area, or None if unknown."""
+    zone = tzs.get(nordpool_area)
+    if zone is None:
+        return None
+    return await async_get_zone(zone)
+
+
+def _parse_dt_fallback(time_str):
     """Parse datetimes to UTC from Stockholm time, which Nord Pool uses."""
     time = parse_dt(time_str, tzinfos={"Z": timezone("Europe/Stockholm")})
     if time.tzinfo is None:
@@ -45,6 +66,39 @@ def _parse_dt(time_str):
     return time.astimezone(utc)
 
 
+@lru_cache(maxsize=4096)
+def _parse_dt(time_str):
+    """Parse datetimes to UTC from Stockholm time, which Nord Pool uses.
+
+    The timestamps of the API are ISO 8601 in UTC, which fromisoformat
+    parses. Anything else, including times without an offset, goes through
+    dateutil. Results are cached, as each deliveryEnd is the deliveryStart
+    of the next row.
+    """
+    try:
+        time = datetime.fromisoformat(time_str)
+    except ValueError:
+        return _parse_dt_fallback(time_str)
+    if time.tzinfo is None:
+        return _parse_dt_fallback(time_str)
+    return time.astimezone(UTC)
+
+
+def _parse_epoch(time_str):
+    """Parse datetimes like _parse_dt, to epoch seconds.
+
+    Not cached, as iter_area_prices parses each timestamp of a response
+    once and a cache lookup costs about as much as the fast path.
+    """
+    try:
+        time = datetime.fromisoformat(time_str)
+    except ValueError:
+        time = None
+    if time is None or time.tzinfo is None:
+        return _parse_dt_fallback(time_str).timestamp()
+    return time.timestamp()
+
+
 def _conv_to_float(s):
     """Convert numbers to float. Return infinity, if conversion fails."""
     # Skip if already float
@@ -56,160 +110,338 @@ def _conv_to_float(s):
         return float("inf")
 
 
-def parse_json(data, currency=None, areas=None):
-    """Parse json response from fetcher.
+def nordpool_area_currency(entity_id: str):
+    """Return the area and currency of a Nord Pool sensor from its entity id.
 
-    Returns dictionary with
-        - start time
-        - end time
-        - update time
-        - currency
-        - dictionary of areas, based on selection
-            - list of values (dictionary with start and endtime and value)
-            - possible other values, such as min, max, average for hourly
+    The ids are like sensor.nordpool_kwh_se3_sek_3_10_025.
     """
-    if data is None:
-        return None
-    if areas is None:
-        areas = []
+    parts = entity_id.split("_")
+    return parts[2].upper(), parts[3].upper()
 
-    if not isinstance(areas, list) and areas is not None:
-        areas = [i.strip() for i in areas.split(",")]
-
-    data_source = ("multiAreaEntries", "entryPerArea")
 
+def _check_response(data):
+    """Raise if data is not a valid response from the api."""
     if data.get("status", 200) != 200 and "version" not in data:
         raise Exception(f"Invalid response from Nordpool API: {data}")
 
-    currency = data.get("currency", currency)
 
-    start_time = None
-    end_time = None
-    # multiAreaDailyAggregates
-    if len(data[data_source[0]]) > 0:
-        start_time = _parse_dt(data[data_source[0]][0]["deliveryStart"])
-        end_time = _parse_dt(data[data_source[0]][-1]["deliveryEnd"])
-    updated = _parse_dt(data["updatedAt"])
+def _area_list(areas):
+    """Return the requested areas as a list."""
+    if areas is None:
+        return []
+    if not isinstance(areas, list):
+        return [i.strip() for i in areas.split(",")]
+    return areas
 
-    area_data = {}
 
-    # Loop through response rows
-    for r in data[data_source[0]]:
-        row_start_time = _parse_dt(r["deliveryStart"])
-        row_end_time = _parse_dt(r["deliveryEnd"])
+def iter_area_prices(data, areas):
+    """Yield the rows of a response with prices for the requested areas.
 
-        # Loop through columns
-        for area_key in r[data_source[1]]:
-            area_price = r[data_source[1]][area_key]
-            # If areas is defined and name isn't in areas, skip column
-            if area_key not in areas:
+    Rows are parsed lazily as they are consumed, each as a (start, end,
+    prices) tuple with the times in epoch seconds and prices holding the
+    price of each of areas in order, None for an area without one. Rows
+    without a price for any of the areas are skipped. Only the requested
+    area keys are looked up, and each timestamp is parsed once, as the end
+    of a row is the start of the next.
+    """
+    areas = _area_list(areas)
+    if len(areas) == 0:
+        return
+    # Rows usually have every area, which one itemgetter call looks up
+    getter = itemgetter(*areas)
+    single = len(areas) == 1
+    fromisoformat = datetime.fromisoformat
+    end_str = end = None
+    for r in data["multiAreaEntries"]:
+        entry_per_area = r["entryPerArea"]
+        try:
+            prices = getter(entry_per_area)
+        except KeyError:
+            prices = tuple(map(entry_per_area.get, areas))
+            if prices.count(None) == len(prices):
                 continue
+        else:
+            if single:
+                prices = (prices,)
+        start_str = r["deliveryStart"]
+        start = end if start_str == end_str else _parse_epoch(start_str)
+        end_str = r["deliveryEnd"]
+        # The fast path of _parse_epoch, inlined as it runs for every row
+        try:
+            time = fromisoformat(end_str)
+        except ValueError:
+            time = None
+        if time is None or time.tzinfo is None:
+            end = _parse_epoch(end_str)
+        else:
+            end = time.timestamp()
+        yield start, end, prices
 
-            # If name isn't in area_data, initialize dictionary
-            if area_key not in area_data:
-                area_data[area_key] = {
-                    "values": [],
-                }
-
-            # Append dictionary to value list
-            area_data[area_key]["values"].append(
-                {
-                    "start": row_start_time,
-                    "end": row_end_time,
-                    "value": _conv_to_float(area_price),
-                }
-            )
 
-    return {
-        "start": start_time,
-        "end": end_time,
-        "updated": updated,
-        "currency": currency,
-        "areas": area_data,
-    }
+def parse_json_areas(data, areas, zone=UTC):
+    """Parse the prices of the requested areas of a response into PriceSeries.
+
+    Returns a dict with a PriceSeries per area. The rows of
+    iter_area_prices are collected once and each area's columns are built
+    from them in one pass, no dictionary is created per price.
+    """
+    if data is None:
+        return None
+    _check_response(data)
+    areas = _area_list(areas)
+    rows = list(iter_area_prices(data, areas))
+    resolution = min((end - start for start, end, _ in rows), default=None)
+    result = {}
+    for i, area in enumerate(areas):
+        starts = array("d", [start for start, _, p in rows if p[i] is not None])
+        values = array(
+            "d",
+            [
+                p[i] if type(p[i]) is float else _conv_to_float(p[i])
+                for _, _, p in rows
+                if p[i] is not None
+            ],
+        )
+        result[area] = PriceSeries(
+            starts, values, resolution or DEFAULT_RESOLUTION, zone
+        )
+    return result
 
 
-async def join_result_for_correct_time(results, dt, nordpool_area):
-    """Join raw data to format correctly.
+async def bucket_local_days(results, now, days, nordpool_area):
+    """Bucket the prices of a list of fetched days into local days.
 
-    Parse a list of responses from the api to extract
-    the correct hours in their timezone.
+    results are PriceSeries in UTC, None for days that could not be fetched.
+    Every interval is converted to the timezone of the area once. Only the
+    local days at the offsets in days from now are kept.
     """
-    fin = []
-    _LOGGER.debug("join_result_for_correct_time %s", dt)
-    zone = tzs.get(nordpool_area)
+    zone = await async_get_area_zone(nordpool_area)
     if zone is None:
         _LOGGER.debug("Failed to get timezone for %s", nordpool_area)
-        return []
-    zone = await dt_utils.async_get_time_zone(zone)
-    start_of_day = dt.astimezone(zone).replace(
-        hour=0, minute=0, second=0, microsecond=0
-    )
-    end_of_day = dt.astimezone(zone).replace(
-        hour=23, minute=59, second=59, microsecond=999999
-    )
+        return DailyPrices.from_intervals({})
+    today = now.astimezone(zone).date()
+    dates = {today + timedelta(days=day) for day in days}
+    intervals = {}
     for day_ in results:
         if day_ is None:
             continue
-        for val in day_["areas"][nordpool_area].get("values", []):
-            start = val["start"]
-            end = val["end"]
-            if type(start) is str:
-                start = datetime.fromisoformat(start)
-                end = datetime.fromisoformat(end)
-            local = start.astimezone(zone)
-            local_end = end.astimezone(zone)
-            if start_of_day <= local <= end_of_day:
-                if local == local_end:
-                    _LOGGER.info(
-                        "Hour has the same start and end, "
-                        "most likely due to dst change %s excluded this hour",
-                        val,
-                    )
-                else:
-                    fin.append(val)
-    return fin
+        resolution = day_.resolution
+        for start, value in zip(day_.starts, day_.values, strict=True):
+            start = float(start)
+            local = datetime.fromtimestamp(start, zone)
+            if local.date() not in dates:
+                continue
+            if local == datetime.fromtimestamp(start + resolution, zone):
+                _LOGGER.info(
+                    "Hour has the same start and end, "
+                    "most likely due to dst change %s excluded this hour",
+                    local,
+                )
+                continue
+            intervals[start] = (local.date(), resolution, float(value))
+    return DailyPrices.from_intervals(intervals, zone)
 
 
-async def fetch_single_day(
+def _save_price_cache(hass: HomeAssistant):
+    """Schedule a write of the price cache."""
+    cache = hass.data[DOMAIN]["price_cache"]
+    hass.data[DOMAIN]["persistence"].async_schedule_save("price_cache", cache.as_dict)
+
+
+async def _fetch_day(
     hass: HomeAssistant, nordpool_currency: str, nordpool_area: str, date: str
 ):
-    """Fetch nordpool data for a single day."""
-    nordpool_values = hass.data[DOMAIN]["values"].get("nordpool_values", {})
-    if nordpool_area not in nordpool_values:
-        nordpool_values[nordpool_area] = []
+    """Fetch nordpool data for a day from the price providers and cache it.
+
+    The providers in hass.data[DOMAIN]["price_providers"] are asked in turn
+    until one has prices. Each gets NORDPOOL_FETCH_TIMEOUT seconds. If all
+    of them failed the day is retried after an exponential backoff, if they
+    had no prices, as the day is not published yet, after
+    NORDPOOL_UNPUBLISHED_TTL. Until then fetch_single_day returns None for
+    the day without asking the providers.
+    """
+    key = (nordpool_area, nordpool_currency, date)
+    failures = hass.data[DOMAIN]["nordpool_failures"]
+    failed = False
+    for provider in hass.data[DOMAIN]["price_providers"]:
+        try:
+            async with asyncio.timeout(NORDPOOL_FETCH_TIMEOUT):
+                series = await provider.async_fetch_day(
+                    hass, nordpool_area, nordpool_currency, date
+                )
+        except Exception:
+            _LOGGER.warning(
+                "Failed to fetch %s data for %s %s %s",
+                provider.name,
+                nordpool_currency,
+                nordpool_area,
+                date,
+            )
+            failed = True
+            continue
+        if series is not None and len(series) > 0:
+            break
     else:
-        nordpool_values[nordpool_area] = [*nordpool_values[nordpool_area]]
-    for value in nordpool_values[nordpool_area]:
-        if value.get("date") == date:
-            _LOGGER.info(
-                "Using cached nordpool data for %s %s %s",
+        if failed:
+            count = failures.get(key, (0, 0))[0] + 1
+            delay = min(
+                NORDPOOL_RETRY_DELAY * 2 ** (count - 1), NORDPOOL_RETRY_MAX_DELAY
+            )
+            failures[key] = (count, time.monotonic() + delay)
+            _LOGGER.error(
+                "Failed to fetch nordpool data for %s %s %s, retrying in %s s",
                 nordpool_currency,
                 nordpool_area,
                 date,
+                delay,
             )
-            return value.get("values")
+            return None
+        failures[key] = (0, time.monotonic() + NORDPOOL_UNPUBLISHED_TTL)
+        _LOGGER.debug(
+            "No nordpool data published for %s %s %s yet",
+            nordpool_currency,
+            nordpool_area,
+            date,
+        )
+        return None
+    failures.pop(key, None)
+    if not provider.cacheable:
+        return series
+    cache = hass.data[DOMAIN]["price_cache"]
+    cache.put(nordpool_area, nordpool_currency, date, series)
+    _save_price_cache(hass)
     try:
-        values = await hass.services.async_call(
-            "nordpool",
-            "hourly",
-            {"currency": nordpool_currency, "area": nordpool_area, "date": date},
-            True,
-            return_response=True,
+        await hass.async_add_executor_job(
+            hass.data[DOMAIN]["price_archive"].append,
+            nordpool_area,
+            nordpool_currency,
+            series,
         )
-    except Exception:
-        _LOGGER.error(
-            "Failed to fetch nordpool data for %s %s %s",
+    except OSError:
+        _LOGGER.exception(
+            "Failed to archive nordpool data for %s %s %s",
             nordpool_currency,
             nordpool_area,
             date,
         )
-        values = None
-    tmp = parse_json(values, nordpool_currency, areas=[nordpool_area])
-    if tmp is not None:
-        nordpool_values[nordpool_area].append({"date": date, "values": tmp})
-    hass.data[DOMAIN]["values"]["nordpool_values"] = nordpool_values
-    return tmp
+    return series
+
+
+async def fetch_single_day(
+    hass: HomeAssistant, nordpool_currency: str, nordpool_area: str, date: str
+):
+    """Fetch nordpool data for a single day.
+
+    Concurrent requests for the same day share one fetch. Returns
+    None while a failed or unpublished day waits for its retry.
+    """
+    cache = hass.data[DOMAIN]["price_cache"]
+    cached = cache.get(nordpool_area, nordpool_currency, date)
+    if cached is not None:
+        _LOGGER.debug(
+            "Using cached nordpool data for %s %s %s (%s hits, %s misses)",
+            nordpool_currency,
+            nordpool_area,
+            date,
+            cache.hits,
+            cache.misses,
+        )
+        return cached
+    key = (nordpool_area, nordpool_currency, date)
+    failure = hass.data[DOMAIN]["nordpool_failures"].get(key)
+    if failure is not None and failure[1] > time.monotonic():
+        _LOGGER.debug(
+            "Not fetching nordpool data for %s %s %s for another %.0f s",
+            nordpool_currency,
+            nordpool_area,
+            date,
+            failure[1] - time.monotonic(),
+        )
+        return None
+    in_flight = hass.data[DOMAIN]["nordpool_fetches"]
+    if key not in in_flight:
+        task = hass.async_create_task(
+            _fetch_day(hass, nordpool_currency, nordpool_area, date)
+        )
+        in_flight[key] = task
+        task.add_done_callback(lambda _: in_flight.pop(key, None))
+    else:
+        _LOGGER.debug(
+            "Waiting for pending nordpool fetch of %s %s %s",
+            nordpool_currency,
+            nordpool_area,
+            date,
+        )
+    # A cancelled caller must not cancel the fetch for the others
+    return await asyncio.shield(in_flight[key])
+
+
+def _expire(hass: HomeAssistant, now: datetime):
+    """Evict old days from the price cache and drop stale failures.
+
+    A failure keeps its count after its retry time, so the backoff grows
+    until a fetch succeeds. It is dropped once its date is before the
+    fetched days, or when it has not been retried for
+    NORDPOOL_RETRY_MAX_DELAY after its retry time.
+    """
+    if hass.data[DOMAIN]["price_cache"].evict(now.date()):
+        _save_price_cache(hass)
+    first = (now - timedelta(days=2)).strftime("%Y-%m-%d")
+    stale = time.monotonic() - NORDPOOL_RETRY_MAX_DELAY
+    failures = hass.data[DOMAIN]["nordpool_failures"]
+    for key, (_, retry_at) in list(failures.items()):
+        if key[2] < first or retry_at <= stale:
+            del failures[key]
+
+
+def forget_failures(hass: HomeAssistant, first_date: str):
+    """Drop the failures of first_date and later days, to fetch them again.
+
+    Called when new prices are published, so that a day cached as
+    unpublished shortly before is not left out of the next run.
+    """
+    failures = hass.data[DOMAIN]["nordpool_failures"]
+    for key in [key for key in failures if key[2] >= first_date]:
+        del failures[key]
+
+
+def series_from_attributes(attributes):
+    """Return the prices in the attributes of a Nord Pool sensor.
+
+    The raw_today and raw_tomorrow rows become a PriceSeries in UTC. Rows
+    without a value are left out. Returns None if there are no prices, or
+    if they are not for single market time units, as the planners expect.
+    """
+    starts = array("d")
+    values = array("d")
+    for row in [
+        *(attributes.get("raw_today") or []),
+        *(attributes.get("raw_tomorrow") or []),
+    ]:
+        if row.get("value") is None:
+            continue
+        start, end = row["start"], row["end"]
+        start = _parse_epoch(start) if isinstance(start, str) else start.timestamp()
+        end = _parse_epoch(end) if isinstance(end, str) else end.timestamp()
+        if end - start != DEFAULT_RESOLUTION:
+            return None
+        starts.append(start)
+        values.append(float(row["value"]))
+    if len(starts) == 0:
+        return None
+    return PriceSeries(starts, values)
+
+
+def _covers(series, zone, date):
+    """Return whether series has every price of the local date."""
+    start = day_boundary(zone, date)
+    end = day_boundary(zone, date + timedelta(days=1))
+    window = series.window(start, end)
+    return (
+        len(window) > 0
+        and window.starts[0] == start.timestamp()
+        and len(window) * series.resolution == end.timestamp() - start.timestamp()
+    )
 
 
 async def fetch_nordpool_data(
@@ -217,86 +449,44 @@ async def fetch_nordpool_data(
     nordpool_currency: str,
     nordpool_area: str,
     include_tomorrow: bool = True,
+    attributes=None,
+    include_yesterday: bool = True,
 ):
-    """Fetch nordpool data for today, tomorrow and the day after tomorrow."""
+    """Fetch nordpool data for yesterday, today and tomorrow.
+
+    Returns the prices as DailyPrices, with yesterday only if
+    include_yesterday and tomorrow only if include_tomorrow. The prices are
+    the market prices of the nordpool service in the currency per MWh,
+    which is what planners that compute with prices, like the price peak
+    planner, expect.
+
+    attributes are those of the Nord Pool sensor of the area and currency,
+    in the unit of the sensor, usually per kWh with VAT and additional
+    costs. Only planners that just rank prices may pass them, as the unit
+    they get then depends on whether the attributes cover every day of the
+    run. If they do, the prices are taken from them without service calls,
+    otherwise all days come from the cache or are fetched concurrently.
+    """
     now = dt_utils.now()
-    nordpool_values = hass.data[DOMAIN]["values"].get("nordpool_values", {})
-    if nordpool_area not in nordpool_values:
-        nordpool_values[nordpool_area] = []
-    else:
-        nordpool_values[nordpool_area] = [
-            value
-            for value in nordpool_values[nordpool_area]
-            if datetime.strptime(value.get("date"), "%Y-%m-%d")
-            >= datetime.strptime(
-                (now - timedelta(days=2)).strftime("%Y-%m-%d"), "%Y-%m-%d"
+    _expire(hass, now)
+    days = range(-1 if include_yesterday else 0, 2 if include_tomorrow else 1)
+    series = None if attributes is None else series_from_attributes(attributes)
+    zone = None if series is None else await async_get_area_zone(nordpool_area)
+    if zone is not None:
+        today = now.astimezone(zone).date()
+        if all(_covers(series, zone, today + timedelta(days=day)) for day in days):
+            _LOGGER.debug("Using prices of the Nord Pool sensor attributes")
+            return await bucket_local_days([series], now, days, nordpool_area)
+    # Nord Pool days around each local day, as the offsets of areas differ
+    results = await asyncio.gather(
+        *[
+            fetch_single_day(
+                hass,
+                nordpool_currency,
+                nordpool_area,
+                (now + timedelta(days=day)).strftime("%Y-%m-%d"),
             )
+            for day in range(days.start - 1, days.stop + 1)
         ]
-    hass.data[DOMAIN]["values"]["nordpool_values"] = nordpool_values
-    yesterdays_yesterdays_values = await fetch_single_day(
-        hass,
-        nordpool_currency,
-        nordpool_area,
-        (now - timedelta(days=2)).strftime("%Y-%m-%d"),
-    )
-    yesterdays_values = await fetch_single_day(
-        hass,
-        nordpool_currency,
-        nordpool_area,
-        (now - timedelta(days=1)).strftime("%Y-%m-%d"),
-    )
-    todays_values = await fetch_single_day(
-        hass, nordpool_currency, nordpool_area, now.strftime("%Y-%m-%d")
-    )
-    tomorrows_values = await fetch_single_day(
-        hass,
-        nordpool_currency,
-        nordpool_area,
-        (now + timedelta(days=1)).strftime("%Y-%m-%d"),
-    )
-    # _LOGGER.info("Fetching nordpool data for %s %s", nordpool_currency, nordpool_area)
-    # _LOGGER.info("Yesterdays yesterday: %s", yesterdays_yesterdays_values)
-    # _LOGGER.info("Yesterday: %s", yesterdays_values)
-    # _LOGGER.info("Today: %s", todays_values)
-    # _LOGGER.info("Tomorrow: %s", tomorrows_values)
-
-    tomorrows_tomorrows_values = None
-    if include_tomorrow:
-        tomorrows_tomorrows_values = await fetch_single_day(
-            hass,
-            nordpool_currency,
-            nordpool_area,
-            (now + timedelta(days=2)).strftime("%Y-%m-%d"),
-        )
-        # _LOGGER.info("Tomorrow's tomorrow: %s", tomorrows_tomorrows_values)
-
-    yesterday = await join_result_for_correct_time(
-        [
-            yesterdays_yesterdays_values,
-            yesterdays_values,
-            todays_values,
-        ],
-        now - timedelta(days=1),
-        nordpool_area,
     )
-    today = await join_result_for_correct_time(
-        [
-            yesterdays_values,
-            todays_values,
-            tomorrows_values,
-        ],
-        now,
-        nordpool_area,
-    )
-    tomorrow = None
-    if include_tomorrow:
-        tomorrow = await join_result_for_correct_time(
-            [
-                todays_values,
-                tomorrows_values,
-                tomorrows_tomorrows_values,
-            ],
-            now + timedelta(days=1),
-            nordpool_area,
-        )
-    return yesterday, today, tomorrow
+    return await bucket_local_days(results, now, days, nordpool_area)
@@ -0,0 +1,219 @@
+import csv
+import datetime as dt
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from .price_series import DEFAULT_RESOLUTION, PriceSeries
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A price is archived as its start in epoch seconds and its value
+RECORD = struct.Struct("<dd")
+
+
+def _to_epoch(value):
+    """Return epoch seconds of a number, datetime or ISO timestamp.
+
+    Timestamps without an offset are taken as UTC.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            value = dt.datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.UTC)
+    return value.timestamp()
+
+
+def _row_value(row, *names):
+    """Return the first of the fields names of row, ignoring case."""
+    fields = {key.strip().lower(): value for key, value in row.items() if key}
+    for name in names:
+        if fields.get(name) not in (None, ""):
+            return fields[name]
+    raise ValueError(f"Row has none of the fields {', '.join(names)}: {row}")
+
+
+def read_export(path):
+    """Return the (start, value) pairs of a CSV or JSON price export.
+
+    CSV files need a header with a start and a value column, price is
+    accepted for value. JSON files hold a list of rows with the same fields,
+    or an object with such a list in raw_today, raw_tomorrow or values, as
+    exported from the attributes of a Nord Pool sensor. Starts are epoch
+    seconds or ISO timestamps.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+    elif path.suffix.lower() == ".json":
+        with path.open(encoding="utf-8") as file:
+            data = json.load(file)
+        if isinstance(data, dict):
+            rows = [
+                *(data.get("raw_today") or []),
+                *(data.get("raw_tomorrow") or []),
+                *(data.get("values") or []),
+            ]
+        else:
+            rows = data
+    else:
+        raise ValueError(f"Unsupported price export {path}, expected .csv or .json")
+    return [
+        (
+            _to_epoch(_row_value(row, "start")),
+            float(_row_value(row, "value", "price")),
+        )
+        for row in rows
+    ]
+
+
+class PriceArchive:
+    """Archive of all fetched prices, one file per area and currency.
+
+    Files are arrays of fixed width records of the start in epoch seconds
+    and the value of a price, both little endian float64, in time order.
+    Fetched days are appended, so a year of quarter hour prices of an area
+    is about 560 kB. series memory maps a file and returns its prices as a
+    PriceSeries whose columns view the map, nothing is read into Python
+    objects until it is used.
+
+    All methods do blocking file I/O, run them in the executor. Writes to
+    a file are serialized with a lock per file, as executor jobs run
+    concurrently.
+    """
+
+    def __init__(self, path):
+        """Initialize the archive in the directory path."""
+        self.path = Path(path)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def file(self, area: str, currency: str):
+        """Return the path of the file of an area and currency."""
+        return self.path / f"{area}_{currency}.bin"
+
+    def _lock(self, file):
+        """Return the lock of the writes to file."""
+        with self._locks_lock:
+            return self._locks.setdefault(file, threading.Lock())
+
+    def _last_start(self, file):
+        """Return the start of the last record of file, None if empty."""
+        if not file.exists() or file.stat().st_size < RECORD.size:
+            return None
+        with file.open("rb") as f:
+            f.seek(-RECORD.size, os.SEEK_END)
+            return RECORD.unpack(f.read(RECORD.size))[0]
+
+    def append(self, area: str, currency: str, series: PriceSeries):
+        """Archive the prices of series, return the number added.
+
+        Prices after the end of the file are appended. Prices at or before
+        it are merged, which rewrites the file.
+        """
+        if len(series) == 0:
+            return 0
+        file = self.file(area, currency)
+        with self._lock(file):
+            last = self._last_start(file)
+            if last is not None and series.starts[0] <= last:
+                return self._merge(file, zip(series.starts, series.values, strict=True))
+            file.parent.mkdir(parents=True, exist_ok=True)
+            with file.open("ab") as f:
+                f.writelines(
+                    RECORD.pack(start, value)
+                    for start, value in zip(series.starts, series.values, strict=True)
+                )
+        return len(series)
+
+    def merge(self, area: str, currency: str, prices):
+        """Archive (start, value) pairs in any order, return the number added.
+
+        Prices already archived with the same start are replaced.
+        """
+        file = self.file(area, currency)
+        with self._lock(file):
+            return self._merge(file, prices)
+
+    def _merge(self, file, prices):
+        """Merge prices into file, the lock of file must be held."""
+        records = {}
+        if file.exists():
+            records = dict(RECORD.iter_unpack(file.read_bytes()))
+        count = len(records)
+        records.update((float(start), float(value)) for start, value in prices)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        # The file is replaced at once, so readers never see a partial write
+        fd, tmp = tempfile.mkstemp(dir=file.parent, prefix=f".{file.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(
+                    b"".join(
+                        RECORD.pack(start, records[start]) for start in sorted(records)
+                    )
+                )
+            os.replace(tmp, file)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return len(records) - count
+
+    def import_file(self, area: str, currency: str, path):
+        """Archive the prices of a CSV or JSON export, see read_export."""
+        return self.merge(area, currency, read_export(path))
+
+    def series(
+        self,
+        area: str,
+        currency: str,
+        start=None,
+        end=None,
+        resolution=DEFAULT_RESOLUTION,
+        zone=dt.UTC,
+    ):
+        """Return the archived prices starting in [start, end) as a PriceSeries.
+
+        start and end may be datetimes or epoch seconds, None leaves that
+        side open. The columns view a memory map of the file, which stays
+        open as long as they are referenced. Prices appended later are only
+        seen by later calls.
+        """
+        file = self.file(area, currency)
+        if not file.exists() or file.stat().st_size < RECORD.size:
+            return PriceSeries([], [], resolution, zone)
+        with file.open("rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(data) - len(data) % RECORD.size
+        if np is not None:
+            records = np.frombuffer(data, dtype="<f8", count=size // 8).reshape(-1, 2)
+            starts, values = records[:, 0], records[:, 1]
+        else:
+            if sys.byteorder == "big":
+                # The map can not be viewed in native order, read it instead
+                column = array("d")
+                column.frombytes(data[:size])
+                column.byteswap()
+                records = memoryview(column)
+            else:
+                records = memoryview(data)[:size].cast("d")
+            starts, values = records[0::2], records[1::2]
+        lo = 0 if start is None else bisect_left(starts, _to_epoch(start))
+        hi = len(starts) if end is None else bisect_left(starts, _to_epoch(end))
+        series = PriceSeries(starts, values, resolution, zone)
+        return series.view(lo, max(lo, hi))
@@ -0,0 +1,148 @@
+import base64
+import datetime as dt
+import sys
+from array import array
+
+from ..const import PRICE_CACHE_MAX_DAYS, PRICE_CACHE_RETENTION_DAYS
+from .price_series import PriceSeries
+
+
+def _pack(column):
+    """Return a float64 column as base64 of its little endian bytes."""
+    data = column.tobytes()
+    if sys.byteorder == "big":
+        swapped = array("d", data)
+        swapped.byteswap()
+        data = swapped.tobytes()
+    return base64.b64encode(data).decode("ascii")
+
+
+def _unpack(text):
+    """Return the array("d") packed by _pack."""
+    column = array("d")
+    column.frombytes(base64.b64decode(text))
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+class PriceCache:
+    """Prices of the fetched Nord Pool days by area, currency and date.
+
+    Each day is a PriceSeries in UTC. The cache has its own store, which is
+    only written when days are added or evicted. Stored days are compact: a
+    header with the area, currency and date, the start of the first price,
+    the resolution and the packed prices. Starts are only stored when the
+    prices are not consecutive.
+
+    Days older than retention_days before today are evicted by evict, which
+    does the work at most once per day. The cache never holds more than
+    max_days days, the oldest are evicted first. hits and misses count the
+    lookups with get.
+    """
+
+    def __init__(
+        self,
+        days: dict | None = None,
+        retention_days: int = PRICE_CACHE_RETENTION_DAYS,
+        max_days: int = PRICE_CACHE_MAX_DAYS,
+    ):
+        """Initialize the cache."""
+        self.days = days if days is not None else {}
+        self.retention_days = retention_days
+        self.max_days = max_days
+        self.hits = 0
+        self.misses = 0
+        self.evicted_on = None
+
+    @classmethod
+    def from_dict(cls, data: dict | None, **kwargs):
+        """Build the cache from its stored form, as written by as_dict."""
+        days = {}
+        for day in (data or {}).get("days", []):
+            if "currency" not in day:
+                # Stored before the currency was part of the key, fetch again
+                continue
+            values = _unpack(day["values"])
+            if "starts" in day:
+                starts = _unpack(day["starts"])
+            else:
+                start = day["start"]
+                resolution = day["resolution"]
+                starts = array(
+                    "d", (start + i * resolution for i in range(len(values)))
+                )
+            days[(day["area"], day["currency"], day["date"])] = PriceSeries(
+                starts, values, day["resolution"], dt.UTC
+            )
+        return cls(days, **kwargs)
+
+    def as_dict(self):
+        """Return the cache in its stored form."""
+        days = []
+        for (area, currency, date), series in self.days.items():
+            day = {
+                "area": area,
+                "currency": currency,
+                "date": date,
+                "start": float(series.starts[0]) if len(series) > 0 else None,
+                "resolution": series.resolution,
+                "values": _pack(series.values),
+            }
+            if any(
+                start != day["start"] + i * series.resolution
+                for i, start in enumerate(series.starts)
+            ):
+                day["starts"] = _pack(series.starts)
+            days.append(day)
+        return {"days": days}
+
+    def get(self, area: str, currency: str, date: str):
+        """Return the prices of an area for a date, or None if not cached."""
+        series = self.days.get((area, currency, date))
+        if series is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return series
+
+    def put(self, area: str, currency: str, date: str, series: PriceSeries):
+        """Cache the prices of an area for a date.
+
+        Returns whether other days were evicted to stay within max_days.
+        """
+        self.days[(area, currency, date)] = series
+        return self._evict_over_cap()
+
+    def _evict_over_cap(self):
+        """Evict the oldest days over max_days, return whether any were."""
+        over = len(self.days) - self.max_days
+        if over <= 0:
+            return False
+        for key in sorted(self.days, key=lambda key: key[2])[:over]:
+            del self.days[key]
+        return True
+
+    def evict(self, today: dt.date):
+        """Evict the days older than the retention window.
+
+        Only the first call of a day does any work. Returns whether any days
+        were evicted.
+        """
+        if self.evicted_on == today:
+            return False
+        self.evicted_on = today
+        oldest = (today - dt.timedelta(days=self.retention_days)).isoformat()
+        old = [key for key in self.days if key[2] < oldest]
+        for key in old:
+            del self.days[key]
+        return self._evict_over_cap() or len(old) > 0
+
+    def stats(self):
+        """Return the size and hit counts of the cache for diagnostics."""
+        return {
+            "days": len(self.days),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted_on": None if self.evicted_on is None else str(self.evicted_on),
+        }
@@ -4,15 +4,21 @@ import logging
 from homeassistant.core import HomeAssistant
 
 from .manual_slots import add_manual_slots
-from .nordpool_utils import fetch_nordpool_data, tzs
+from .nordpool_utils import (
+    async_get_area_zone,
+    fetch_nordpool_data,
+    nordpool_area_currency,
+)
+from .price_series import PriceSeries
 from .utils import (
+    set_planned_for,
     update_entities,
-    parse_datetime,
     reset,
     store_disable_state,
     restore_disable_state,
 )
 from ..const import DOMAIN
+from ..utils import day_boundary
 from homeassistant.util import dt as dt_utils
 
 _LOGGER = logging.getLogger(__name__)
@@ -160,7 +166,7 @@ def match_charge_discharge_periods(
     return matched_pairs
 
 
-async def plan_day(hass: HomeAssistant, nordpool_values: [dict], config: dict):
+async def plan_day(hass: HomeAssistant, nordpool_values: PriceSeries, config: dict):
     """Plan a day based on nordpool values."""
     _LOGGER.info("plan_day: %s", nordpool_values)
     charge_hours = float(
@@ -188,7 +194,7 @@ async def plan_day(hass: HomeAssistant, nordpool_values: [dict], config: dict):
         "price_peak_planner_inbetween_state", "pause"
     )
 
-    prices = [x["value"] for x in nordpool_values]
+    prices = nordpool_values.values.tolist()
     charge_window_size = int(charge_hours * 4)  # 2 hours * 4 (15 min intervals)
     discharge_window_size = int(discharge_hours * 4)
     used_indices = set()
@@ -361,54 +367,40 @@ async def plan_day(hass: HomeAssistant, nordpool_values: [dict], config: dict):
             continue
         prev = slot
         if slot == "c":
-            schedule[-1]["end"] = nordpool_values[i]["start"]
+            schedule[-1]["end"] = nordpool_values.start(i)
             schedule.append(
                 {
-                    "start": nordpool_values[i]["start"],
+                    "start": nordpool_values.start(i),
                     "state": price_peak_planner_cheap_state,
                     "soc": 100,
                 }
             )
         elif slot == "d":
-            schedule[-1]["end"] = nordpool_values[i]["start"]
+            schedule[-1]["end"] = nordpool_values.start(i)
             schedule.append(
                 {
-                    "start": nordpool_values[i]["start"],
+                    "start": nordpool_values.start(i),
                     "state": price_peak_planner_expensive_state,
                     "soc": 0,
                 }
             )
         else:
-            schedule[-1]["end"] = nordpool_values[i]["start"]
+            schedule[-1]["end"] = nordpool_values.start(i)
             schedule.append(
                 {
-                    "start": nordpool_values[i]["start"],
+                    "start": nordpool_values.start(i),
                     "state": price_peak_planner_inbetween_state,
                     "soc": 100,
                 }
             )
-    schedule[-1]["end"] = nordpool_values[-1]["end"]
+    schedule[-1]["end"] = nordpool_values.end(-1)
     schedule.pop(0)
     now = dt_utils.now()
     # remove past hours
     schedule = [x for x in schedule if x["end"] > now]
     _LOGGER.info("schedule: %s", schedule)
-    index = 1
-    while True:
-        if hass.data[DOMAIN]["values"][f"slot_{index}_state"] == "off":
-            break
-        index += 1
-    for i, slot in enumerate(schedule):
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_date_time_start"] = slot["start"]
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_state"] = slot["state"]
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_active"] = True
-        hass.data[DOMAIN]["values"][f"slot_{index + i}_soc"] = slot["soc"]
-    if len(schedule) > 0:
-        hass.data[DOMAIN]["values"][f"slot_{index + len(schedule)}_date_time_start"] = (
-            schedule[-1]["end"]
-        )
-        hass.data[DOMAIN]["values"][f"slot_{index + len(schedule)}_state"] = "off"
-        hass.data[DOMAIN]["values"][f"slot_{index + len(schedule)}_active"] = False
+    slots = hass.data[DOMAIN]["slots"]
+    slots.assign(slots.first_off(), schedule)
 
     _LOGGER.info("matched charge/discharge periods: %s", schedule)
 
@@ -418,8 +410,7 @@ async def planner(hass: HomeAssistant, *args, **kwargs):
     nordpool_entity_id = hass.data[DOMAIN]["config"].get("nordpool_entity_id")
     if nordpool_entity_id is None:
         raise ValueError("Nordpool entity not set")
-    nordpool_currency = str(nordpool_entity_id.split("_")[3]).upper()
-    nordpool_area = str(nordpool_entity_id.split("_")[2]).upper()
+    nordpool_area, nordpool_currency = nordpool_area_currency(nordpool_entity_id)
 
     nordpool_state = hass.states.get(nordpool_entity_id)
     if nordpool_state is None:
@@ -428,41 +419,30 @@ async def planner(hass: HomeAssistant, *args, **kwargs):
     _LOGGER.info("Running planner")
 
     tomorrow_valid = attributes.get("tomorrow_valid")
-    yesterday, today, tomorrow = await fetch_nordpool_data(
-        hass, nordpool_currency, nordpool_area, tomorrow_valid
+    # The profit check computes with market prices per MWh, so the prices
+    # always come from the service, never from the sensor attributes
+    prices = await fetch_nordpool_data(
+        hass,
+        nordpool_currency,
+        nordpool_area,
+        tomorrow_valid,
+        include_yesterday=False,
     )
-    if yesterday is None or today is None:
+    if len(prices) == 0:
         raise ValueError("Nordpool data not found")
     await store_disable_state(hass)
     await reset(hass)
     now = dt_utils.now()
-    zone = tzs.get(nordpool_area)
+    zone = await async_get_area_zone(nordpool_area)
     if zone is None:
         _LOGGER.debug("Failed to get timezone for %s", nordpool_area)
         return
-    zone = await dt_utils.async_get_time_zone(zone)
-    start_of_day = now.astimezone(zone).replace(
-        hour=0,
-        minute=0,
-        second=0,
-        microsecond=0,
-    )
+    today = now.astimezone(zone).date()
+    start_of_day = day_boundary(zone, today)
     config = {
         "start_of_day": start_of_day,
     }
-    days = [*yesterday, *today]
-    if tomorrow is not None:
-        days = [*yesterday, *today, *tomorrow]
-
-    data = [
-        {
-            "start": parse_datetime(x["start"], zone),
-            "end": parse_datetime(x["end"], zone),
-            "value": x["value"],
-        }
-        for x in days
-        if start_of_day <= parse_datetime(x["start"], zone)
-    ]
+    data = prices.window(start_of_day)
 
     await plan_day(hass, data, config)
 
@@ -470,3 +450,4 @@ async def planner(hass: HomeAssistant, *args, **kwargs):
     await restore_disable_state(hass)
     await update_entities(hass)
     await hass.data[DOMAIN]["save"]()
+    set_planned_for(hass, prices)
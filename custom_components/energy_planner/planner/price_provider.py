@@ -0,0 +1,96 @@
+import datetime as dt
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+
+from ..utils import LOCAL_ZONE, async_get_zone, day_boundary
+from .nordpool_utils import parse_json_areas
+from .price_archive import read_export
+from .price_series import PriceSeries
+
+
+class PriceProvider(ABC):
+    """Source of the prices of Nord Pool delivery days.
+
+    async_fetch_day returns the prices of an area and currency for a date
+    as a PriceSeries in UTC, or None if the source has no prices for it.
+    Errors are raised, they are retried with a backoff by the caller, see
+    nordpool_utils.fetch_single_day. Days from a cacheable provider are kept
+    in the price cache and archive, the others are fetched on every run.
+    """
+
+    name = "provider"
+    cacheable = True
+
+    @abstractmethod
+    async def async_fetch_day(
+        self, hass: HomeAssistant, area: str, currency: str, date: str
+    ) -> PriceSeries | None:
+        """Return the prices of a date, None if there are none."""
+
+
+class NordpoolProvider(PriceProvider):
+    """Prices from the hourly service of the nordpool integration."""
+
+    name = "nordpool"
+
+    async def async_fetch_day(self, hass, area, currency, date):
+        """Return the prices of a date, None if there are none."""
+        values = await hass.services.async_call(
+            "nordpool",
+            "hourly",
+            {"currency": currency, "area": area, "date": date},
+            True,
+            return_response=True,
+        )
+        series = parse_json_areas(values, [area])
+        return None if series is None else series[area]
+
+
+class FileProvider(PriceProvider):
+    """Prices from exports in a local directory.
+
+    Each area and currency has a file {area}_{currency}.csv or .json in the
+    format of price_archive.read_export, with quarter hour prices of any
+    number of days. Files are read again when they change. Reading local
+    files is cheap and deterministic, so the days are not cached.
+    """
+
+    name = "file"
+    cacheable = False
+
+    def __init__(self, path):
+        """Initialize the provider for the directory path."""
+        self.path = Path(path)
+        self._files = {}
+
+    def _load(self, area: str, currency: str):
+        """Return all prices of an area and currency, None without a file."""
+        for suffix in (".csv", ".json"):
+            file = self.path / f"{area}_{currency}{suffix}"
+            if file.exists():
+                break
+        else:
+            return None
+        mtime = file.stat().st_mtime
+        if file not in self._files or self._files[file][0] != mtime:
+            prices = sorted(dict(read_export(file)).items())
+            self._files[file] = (
+                mtime,
+                PriceSeries([p[0] for p in prices], [p[1] for p in prices]),
+            )
+        return self._files[file][1]
+
+    async def async_fetch_day(self, hass, area, currency, date):
+        """Return the prices of a date, None if there are none."""
+        series = await hass.async_add_executor_job(self._load, area, currency)
+        if series is None:
+            return None
+        # Delivery days are in Nord Pool's time
+        zone = await async_get_zone(LOCAL_ZONE)
+        day = dt.date.fromisoformat(date)
+        window = series.window(
+            day_boundary(zone, day), day_boundary(zone, day + dt.timedelta(days=1))
+        )
+        return window if len(window) > 0 else None
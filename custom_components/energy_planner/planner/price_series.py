@@ -0,0 +1,195 @@
+import datetime as dt
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Nord Pool market time unit
+DEFAULT_RESOLUTION = 900
+
+
+def _epoch(value):
+    """Return epoch seconds of a datetime or number."""
+    if isinstance(value, (int, float)):
+        return value
+    return value.timestamp()
+
+
+def _column(values):
+    """Return a float64 column of values, float64 views are not copied."""
+    if np is not None:
+        return np.asarray(values, dtype=np.float64)
+    if isinstance(values, memoryview) and values.format == "d":
+        return values
+    return memoryview(array("d", values))
+
+
+class PriceSeries:
+    """Prices of consecutive market time units in contiguous columns.
+
+    starts holds the epoch seconds of the start of each price and values the
+    prices, as NumPy arrays when NumPy is available and as memoryviews of
+    array("d") otherwise. Each price lasts resolution seconds. Slicing with
+    window returns views on the same columns, nothing is copied.
+
+    Datetimes returned by start and end are in zone.
+    """
+
+    __slots__ = ("resolution", "starts", "values", "zone")
+
+    def __init__(self, starts, values, resolution=DEFAULT_RESOLUTION, zone=dt.UTC):
+        """Initialize the series."""
+        self.starts = _column(starts)
+        self.values = _column(values)
+        self.resolution = resolution
+        self.zone = zone
+
+    @classmethod
+    def from_rows(cls, rows, zone=dt.UTC):
+        """Create a series from rows with start, end and value.
+
+        start and end are datetimes. The resolution is the shortest row.
+        """
+        starts = array("d")
+        values = array("d")
+        resolution = None
+        for row in rows:
+            start = _epoch(row["start"])
+            duration = _epoch(row["end"]) - start
+            if resolution is None or duration < resolution:
+                resolution = duration
+            starts.append(start)
+            values.append(row["value"])
+        return cls(starts, values, resolution or DEFAULT_RESOLUTION, zone)
+
+    def view(self, lo, hi):
+        """Return a series viewing the rows lo to hi."""
+        view = PriceSeries.__new__(PriceSeries)
+        view.starts = self.starts[lo:hi]
+        view.values = self.values[lo:hi]
+        view.resolution = self.resolution
+        view.zone = self.zone
+        return view
+
+    def _index(self, value):
+        """Return the index of the first row starting at or after value."""
+        if np is not None:
+            return int(np.searchsorted(self.starts, _epoch(value), "left"))
+        return bisect_left(self.starts, _epoch(value))
+
+    def window(self, start=None, end=None):
+        """Return a view of the rows starting in [start, end).
+
+        start and end may be datetimes or epoch seconds, None leaves that
+        side open.
+        """
+        lo = 0 if start is None else self._index(start)
+        hi = len(self) if end is None else self._index(end)
+        return self.view(lo, max(lo, hi))
+
+    def start(self, index):
+        """Return the start of row index as a datetime."""
+        return dt.datetime.fromtimestamp(float(self.starts[index]), self.zone)
+
+    def end(self, index):
+        """Return the end of row index as a datetime."""
+        return dt.datetime.fromtimestamp(
+            float(self.starts[index]) + self.resolution, self.zone
+        )
+
+    def lowest(self, count):
+        """Return the indexes of the count lowest prices, in time order.
+
+        Of equal prices, the earliest are taken first.
+        """
+        if np is not None:
+            return sorted(np.argsort(self.values, kind="stable")[:count].tolist())
+        return sorted(sorted(range(len(self)), key=self.values.__getitem__)[:count])
+
+    def highest(self, count):
+        """Return the indexes of the count highest prices, in time order.
+
+        Of equal prices, the earliest are taken first.
+        """
+        if np is not None:
+            return sorted(np.argsort(-self.values, kind="stable")[:count].tolist())
+        return sorted(
+            sorted(range(len(self)), key=self.values.__getitem__, reverse=True)[:count]
+        )
+
+    def rows(self):
+        """Return the rows as start, end and value dicts."""
+        return [
+            {"start": self.start(i), "end": self.end(i), "value": float(v)}
+            for i, v in enumerate(self.values)
+        ]
+
+    def __len__(self):
+        """Return the number of prices."""
+        return len(self.starts)
+
+    def __repr__(self):
+        """Return a short description of the series."""
+        if len(self) == 0:
+            return "PriceSeries([])"
+        return (
+            f"PriceSeries({len(self)} prices every {self.resolution:g} s "
+            f"from {self.start(0).isoformat()})"
+        )
+
+
+class DailyPrices:
+    """Prices bucketed into local days.
+
+    series holds the prices of all days in time order and days maps each
+    local date to the range of its rows in series.
+    """
+
+    __slots__ = ("days", "series")
+
+    def __init__(self, series: PriceSeries, days: dict):
+        """Initialize the prices."""
+        self.series = series
+        self.days = days
+
+    @classmethod
+    def from_intervals(cls, intervals: dict, zone=dt.UTC):
+        """Create the prices from intervals by start epoch.
+
+        Each interval is a (local date, duration, value) tuple.
+        """
+        starts = array("d")
+        values = array("d")
+        days = {}
+        resolution = None
+        for i, start in enumerate(sorted(intervals)):
+            date, duration, value = intervals[start]
+            if resolution is None or duration < resolution:
+                resolution = duration
+            starts.append(start)
+            values.append(value)
+            lo, _ = days.get(date, (i, i))
+            days[date] = (lo, i + 1)
+        series = PriceSeries(starts, values, resolution or DEFAULT_RESOLUTION, zone)
+        return cls(series, days)
+
+    def day(self, date: dt.date):
+        """Return a view of the prices of a local date, or None if missing."""
+        if date not in self.days:
+            return None
+        return self.series.view(*self.days[date])
+
+    def window(self, start=None, end=None):
+        """Return a view of the prices starting in [start, end)."""
+        return self.series.window(start, end)
+
+    def __len__(self):
+        """Return the number of prices."""
+        return len(self.series)
+
+    def __repr__(self):
+        """Return a short description of the prices."""
+        return f"DailyPrices({', '.join(str(d) for d in self.days)}: {self.series!r})"
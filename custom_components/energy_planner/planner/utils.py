@@ -1,9 +1,9 @@
 import logging
 
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_point_in_time
 from homeassistant.util import dt as dt_utils
 
-import datetime as dt
 
 from ..const import (
     DOMAIN,
@@ -12,7 +12,9 @@ from ..const import (
     SELECT_ENTITIES,
     SWITCH_ENTITIES,
     NUMBER_ENTITIES,
+    SENSOR_ENTITIES,
 )
+from ..slot_entities import sync_slot_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,25 +24,18 @@ async def store_disable_state(hass: HomeAssistant):
     _LOGGER.info("Resetting planner")
     if "tmp" not in hass.data[DOMAIN]:
         hass.data[DOMAIN]["tmp"] = {}
-    hass.data[DOMAIN]["tmp"]["disable_state"] = []
-    for i in range(1, 50):
-        if (
-            hass.data[DOMAIN]["values"][f"slot_{i}_state"] != "off"
-            and not hass.data[DOMAIN]["values"][f"slot_{i}_active"]
-        ):
-            hass.data[DOMAIN]["tmp"]["disable_state"].append(
-                {
-                    "start": str(
-                        hass.data[DOMAIN]["values"][f"slot_{i}_date_time_start"]
-                    ),
-                    "end": str(
-                        hass.data[DOMAIN]["values"][f"slot_{i + 1}_date_time_start"]
-                    ),
-                    "state": hass.data[DOMAIN]["values"][f"slot_{i}_state"],
-                    "active": hass.data[DOMAIN]["values"][f"slot_{i}_active"],
-                    "soc": hass.data[DOMAIN]["values"][f"slot_{i}_soc"],
-                }
-            )
+    slots = hass.data[DOMAIN]["slots"]
+    hass.data[DOMAIN]["tmp"]["disable_state"] = [
+        {
+            "start": slots.start_epoch(i),
+            "end": slots.start_epoch(i + 1),
+            "state": slots.get_state(i),
+            "active": False,
+            "soc": slots.get_soc(i),
+        }
+        for i in range(len(slots))
+        if slots.get_state(i) != "off" and not slots.get_active(i)
+    ]
 
 
 async def restore_disable_state(hass: HomeAssistant):
@@ -50,88 +45,123 @@ async def restore_disable_state(hass: HomeAssistant):
         return
     if "disable_state" not in hass.data[DOMAIN]["tmp"]:
         return
-    for i in range(1, 49):
-        for s in hass.data[DOMAIN]["tmp"]["disable_state"]:
-            if (
-                str(hass.data[DOMAIN]["values"][f"slot_{i}_date_time_start"])
-                == s["start"]
-                and str(hass.data[DOMAIN]["values"][f"slot_{i + 1}_date_time_start"])
-                == s["end"]
-            ):
-                hass.data[DOMAIN]["values"][f"slot_{i}_active"] = False
+    slots = hass.data[DOMAIN]["slots"]
+    disabled = {
+        (s["start"], s["end"]) for s in hass.data[DOMAIN]["tmp"]["disable_state"]
+    }
+    for i in range(len(slots) - 1):
+        if (slots.start_epoch(i), slots.start_epoch(i + 1)) in disabled:
+            slots.set_active(i, False)
     del hass.data[DOMAIN]["tmp"]["disable_state"]
 
 
 async def reset(hass: HomeAssistant):
     """Reset planner."""
     _LOGGER.info("Resetting planner")
-    for i in range(1, 50):
-        hass.data[DOMAIN]["values"][f"slot_{i}_date_time_start"] = None
-        hass.data[DOMAIN]["values"][f"slot_{i}_state"] = "off"
-        hass.data[DOMAIN]["values"][f"slot_{i}_active"] = False
-        hass.data[DOMAIN]["values"][f"slot_{i}_soc"] = 50
+    hass.data[DOMAIN]["slots"].clear()
+
 
+def set_planned_for(hass: HomeAssistant, prices):
+    """Record the last local day of the prices a planner run planned with.
 
-def parse_datetime(val, zone=None):
-    """Parse datetime."""
-    if zone is None:
-        return dt_utils.parse_datetime(val) if type(val) is str else val
-    tmp = dt.datetime.fromisoformat(val) if type(val) is str else val
-    if tmp is None:
-        return None
-    return tmp.astimezone(zone)
+    The fallback planner skips the day once it is planned, so a run only
+    counts as planning tomorrow if it had tomorrow's prices.
+    """
+    if prices.days:
+        hass.data[DOMAIN]["planned_for"] = max(prices.days)
 
 
 async def update_entities(hass: HomeAssistant, values=True, config=False):
-    """Update entities."""
+    """Update entities.
+
+    Slot entities are only considered if their slot has changed since the
+    last update, and states are only written for entities whose value
+    changed. The writes are done together after all entities are refreshed.
+    """
+    if values:
+        sync_slot_entities(hass)
+    dirty = hass.data[DOMAIN]["slots"].take_dirty() if values else set()
+    changed = []
+    suppressed = 0
     for platform in [
         DATE_TIME_ENTITIES,
         TIME_ENTITIES,
         SELECT_ENTITIES,
         SWITCH_ENTITIES,
         NUMBER_ENTITIES,
+        SENSOR_ENTITIES,
     ]:
         for entity in hass.data[DOMAIN][platform]:
             if (values and entity.data_store == "values") or (
                 config and entity.data_store == "config"
             ):
-                entity.update()
+                slot_index = entity.slot_index
+                if (slot_index is None or slot_index in dirty) and entity.refresh():
+                    changed.append(entity)
+                else:
+                    suppressed += 1
+    for entity in changed:
+        if entity.is_added_to_hass:
+            entity.async_write_ha_state()
+    stats = hass.data[DOMAIN]["stats"]
+    stats["state_writes"] += len(changed)
+    stats["suppressed_writes"] += suppressed
+    _LOGGER.debug(
+        "Updated %s entities, suppressed %s unchanged (%s suppressed in total)",
+        len(changed),
+        suppressed,
+        stats["suppressed_writes"],
+    )
 
 
 async def clear_passed_slots(hass: HomeAssistant):
-    """Clear passed slots."""
+    """Clear passed slots.
+
+    Drops every slot that has been followed by a started slot in one step, so
+    that a restart or a stalled event loop catches up immediately.
+    """
     now = dt_utils.now()
-    next_slot_start = hass.data[DOMAIN]["values"].get("slot_2_date_time_start")
-    if next_slot_start is None:
-        return
-    if type(next_slot_start) is str:
-        next_slot_start = dt_utils.parse_datetime(next_slot_start)
-    if now > next_slot_start:
-        # shift all slots one step back
-        for i in range(2, 50):
-            hass.data[DOMAIN]["values"][f"slot_{i - 1}_date_time_start"] = hass.data[
-                DOMAIN
-            ]["values"].get(f"slot_{i}_date_time_start")
-            hass.data[DOMAIN]["values"][f"slot_{i - 1}_active"] = hass.data[DOMAIN][
-                "values"
-            ].get(f"slot_{i}_active")
-            hass.data[DOMAIN]["values"][f"slot_{i - 1}_state"] = hass.data[DOMAIN][
-                "values"
-            ].get(f"slot_{i}_state")
-            hass.data[DOMAIN]["values"][f"slot_{i - 1}_soc"] = hass.data[DOMAIN][
-                "values"
-            ].get(f"slot_{i}_soc")
+    slots = hass.data[DOMAIN]["slots"]
+    # Index of the first slot after the current one that has not started yet
+    passed = slots.bisect_start(now.timestamp(), 1, right=True) - 1
+    if passed > 0:
+        slots.advance(passed)
         for s in hass.data[DOMAIN]["manual_slots"]:
-            end = s["end"]
-            if type(end) is str:
-                end = dt_utils.parse_datetime(s["end"])
-            if end < now:
+            if s["end"] < now:
                 hass.data[DOMAIN]["manual_slots"].remove(s)
 
         await update_entities(hass)
         await hass.data[DOMAIN]["save"]()
 
 
+def cancel_slot_timer(hass: HomeAssistant):
+    """Cancel the timer for the next slot start."""
+    cancel = hass.data[DOMAIN].get("slot_timer")
+    if cancel is not None:
+        cancel()
+    hass.data[DOMAIN]["slot_timer"] = None
+
+
+def arm_slot_timer(hass: HomeAssistant):
+    """Arm a timer for the start of the next slot, replacing any armed one.
+
+    Must be called whenever the schedule changes.
+    """
+    cancel_slot_timer(hass)
+    next_slot_start = hass.data[DOMAIN]["slots"].start_epoch(1)
+    if next_slot_start is None:
+        return
+
+    async def slot_started(now):
+        hass.data[DOMAIN]["slot_timer"] = None
+        await clear_passed_slots(hass)
+        arm_slot_timer(hass)
+
+    hass.data[DOMAIN]["slot_timer"] = async_track_point_in_time(
+        hass, slot_started, dt_utils.utc_from_timestamp(next_slot_start)
+    )
+
+
 def get_nordpool_price_per_kwh_in_cent(raw_price, tax=0.25):
     """Convert raw nordpool price to price per kWh in cents."""
     return raw_price * 0.1 * (1 + tax)
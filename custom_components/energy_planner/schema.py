@@ -0,0 +1,82 @@
+import datetime as dt
+
+from .slot_schedule import SlotValues
+from .utils import LOCAL_ZONE, get_zone
+
+# Config values that are times of day
+CONFIG_TIMES = ("earliest_charge_time", "earliest_discharge_time")
+
+
+def _iso_to_epoch(value):
+    """Return the epoch seconds of an ISO timestamp, None if unset."""
+    if not value:
+        return None
+    return dt.datetime.fromisoformat(value).timestamp()
+
+
+def migrate(key, old_version, data):
+    """Migrate the data of the store key from old_version to the current schema.
+
+    Version 1 stored slot starts as ISO strings and the Nord Pool day cache
+    with the values. Version 2 stores slot starts as epoch seconds and the
+    day cache in its own store, the old cache is dropped and fetched again.
+    """
+    if int(old_version) < 2 and key == "values":
+        data = {
+            k: _iso_to_epoch(v) if k.endswith("_date_time_start") else v
+            for k, v in data.items()
+            if k != "nordpool_values"
+        }
+    return data
+
+
+def decode_values(data):
+    """Return the SlotValues of stored values."""
+    values = SlotValues.from_dict(data)
+    # The Nord Pool day cache has its own store
+    values.extra.pop("nordpool_values", None)
+    return values
+
+
+def encode_values(values: SlotValues):
+    """Return values in their stored form."""
+    return values.as_dict()
+
+
+def decode_config(data):
+    """Return the stored config with times of day as dt.time."""
+    return {
+        key: dt.time.fromisoformat(value)
+        if key in CONFIG_TIMES and value is not None
+        else value
+        for key, value in data.items()
+    }
+
+
+def encode_config(config):
+    """Return config in its stored form."""
+    return {
+        key: value.isoformat() if isinstance(value, dt.time) else value
+        for key, value in config.items()
+    }
+
+
+def decode_manual_slots(data):
+    """Return the stored manual slots with start and end as local datetimes."""
+    zone = get_zone(LOCAL_ZONE)
+    return [
+        {
+            **s,
+            "start": dt.datetime.fromisoformat(s["start"]).astimezone(zone),
+            "end": dt.datetime.fromisoformat(s["end"]).astimezone(zone),
+        }
+        for s in data
+    ]
+
+
+def encode_manual_slots(manual_slots):
+    """Return the manual slots in their stored form."""
+    return [
+        {**s, "start": s["start"].isoformat(), "end": s["end"].isoformat()}
+        for s in manual_slots
+    ]
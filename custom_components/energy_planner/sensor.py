@@ -2,43 +2,91 @@
 
 from __future__ import annotations
 
-from homeassistant.components.sensor import (
-    SensorDeviceClass,
-    SensorEntity,
-    SensorStateClass,
-)
+import logging
+
+from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature
-from custom_components.energy_planner import _LOGGER
+
+from custom_components.energy_planner.const import DOMAIN, SENSOR_ENTITIES, SLOT_STATES
+from custom_components.energy_planner.entity import (
+    EnergyPlannerEntity,
+    prepare_entities,
+)
+from custom_components.energy_planner.slot_schedule import from_epoch, to_epoch
+
+_LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_devices):
     """Set up the sensor platform."""
     _LOGGER.info("Setting up sensor platform")
-    async_add_devices([ExampleSensor()], True)
+    sensors = [
+        EnergyPlannerScheduleSensor(
+            hass,
+            {
+                "id": "schedule",
+                "name": "Schedule",
+                "icon": "mdi:calendar-clock",
+                "enabled": True,
+            },
+        )
+    ]
+
+    hass.data[DOMAIN][SENSOR_ENTITIES] = sensors
+    prepare_entities(sensors)
+    async_add_devices(sensors)
     # Return boolean to indicate that initialization was successful
     return True
 
 
-class ExampleSensor(SensorEntity):
-    """Representation of a Sensor."""
-
-    def __init__(self) -> None:
-        """Initialize the sensor."""
-        self._state = None
+class EnergyPlannerScheduleSensor(EnergyPlannerEntity, SensorEntity):
+    """Sensor exposing the whole schedule.
 
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return "Example Temperature"
+    The state is the current action, "off" if the current slot is inactive,
+    and the schedule attribute lists every planned slot. The schedule has no
+    size limit and can outgrow what the recorder stores, so it is not
+    recorded, the history of the state is.
+    """
 
-    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-    _attr_device_class = SensorDeviceClass.TEMPERATURE
-    _attr_state_class = SensorStateClass.MEASUREMENT
+    platform_domain = "sensor"
+    _unrecorded_attributes = frozenset({"schedule"})
 
-    def update(self) -> None:
-        """Fetch new state data for the sensor.
+    def __init__(self, hass, entity_definition):
+        """Initialize the sensor."""
+        super().__init__(hass, entity_definition)
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = {"schedule": []}
+        self._attr_device_class = "enum"
+        self._attr_options = list(SLOT_STATES)
 
-        This is the only method that should fetch new data for Home Assistant.
-        """
-        self._state = 23
+    def refresh(self) -> bool:
+        """Read the schedule, return whether it changed."""
+        manual_starts = {
+            to_epoch(s["start"]) for s in self._hass.data[DOMAIN]["manual_slots"]
+        }
+        schedule = [
+            {
+                "start": from_epoch(segment["start"]).isoformat(),
+                "end": (
+                    from_epoch(segment["end"]).isoformat()
+                    if segment["end"] is not None
+                    else None
+                ),
+                "state": segment["state"],
+                "soc": segment["soc"],
+                "active": segment["active"],
+                "source": "manual" if segment["start"] in manual_starts else "planner",
+            }
+            for segment in self._hass.data[DOMAIN]["slots"].segments()
+        ]
+        value = "off"
+        if len(schedule) > 0 and schedule[0]["active"]:
+            value = schedule[0]["state"]
+        if (
+            value == self._attr_native_value
+            and schedule == self._attr_extra_state_attributes["schedule"]
+        ):
+            return False
+        self._attr_native_value = value
+        self._attr_extra_state_attributes = {"schedule": schedule}
+        return True
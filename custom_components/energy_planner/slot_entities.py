@@ -0,0 +1,50 @@
+import logging
+
+from .const import DOMAIN, SLOT_COUNT, SLOT_HEADROOM
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def slot_entity_count(hass):
+    """Return the number of slots that should have entities.
+
+    With lazy_slot_entities enabled this follows the schedule, with some
+    headroom, instead of always covering every slot.
+    """
+    if not hass.data[DOMAIN]["config"].get("lazy_slot_entities"):
+        return SLOT_COUNT
+    return min(SLOT_COUNT, hass.data[DOMAIN]["slots"].used() + SLOT_HEADROOM)
+
+
+def register_slot_platform(hass, platform, factory, async_add_devices):
+    """Register how a platform creates and adds its slot entities.
+
+    factory(hass, i) must return the entity of slot i (1-based).
+    """
+    hass.data[DOMAIN]["slot_platforms"][platform] = (factory, async_add_devices)
+
+
+def sync_slot_entities(hass):
+    """Add or remove slot entities to match the number of slots in use."""
+    wanted = slot_entity_count(hass)
+    for platform, (factory, async_add_devices) in hass.data[DOMAIN][
+        "slot_platforms"
+    ].items():
+        entities = hass.data[DOMAIN][platform]
+        slot_entities = [e for e in entities if e.slot_index is not None]
+        count = len(slot_entities)
+        if count < wanted:
+            new_entities = [factory(hass, i) for i in range(count + 1, wanted + 1)]
+            for entity in new_entities:
+                entity.refresh()
+            entities.extend(new_entities)
+            async_add_devices(new_entities)
+            _LOGGER.debug("Added %s %s", len(new_entities), platform)
+        elif count > wanted + SLOT_HEADROOM:
+            # Only shrink once well below the current count to avoid churn
+            removed = [e for e in slot_entities if e.slot_index >= wanted]
+            for entity in removed:
+                entities.remove(entity)
+                if entity.is_added_to_hass:
+                    hass.async_create_task(entity.async_remove())
+            _LOGGER.debug("Removed %s %s", len(removed), platform)
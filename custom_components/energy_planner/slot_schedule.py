@@ -0,0 +1,406 @@
+import datetime as dt
+import logging
+import math
+import re
+from array import array
+from collections.abc import MutableMapping
+
+from homeassistant.util import dt as dt_utils
+
+from .const import SLOT_COUNT, SLOT_STATES
+
+_LOGGER = logging.getLogger(__name__)
+
+SLOT_FIELDS = ("date_time_start", "state", "active", "soc")
+DEFAULT_SOC = 50
+_STATE_CODES = {state: code for code, state in enumerate(SLOT_STATES)}
+_SLOT_KEY = re.compile(r"slot_(\d+)_(date_time_start|state|active|soc)")
+
+
+def to_epoch(value):
+    """Convert a datetime, epoch seconds or None to epoch seconds (nan if unset)."""
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value.timestamp()
+
+
+def from_epoch(value):
+    """Convert epoch seconds to a local datetime, or None if unset."""
+    if math.isnan(value):
+        return None
+    return dt_utils.as_local(dt.datetime.fromtimestamp(value, dt.UTC))
+
+
+class SlotSchedule:
+    """Planned slots stored as compact parallel arrays.
+
+    Slot ``i`` (0-based) is one entry in each array: the start as epoch
+    seconds (nan when unset), the state as an index into ``SLOT_STATES``,
+    the active flag and the target SOC.
+
+    The arrays form a ring buffer, slot ``i`` lives at ``(head + i) %
+    capacity``, so dropping passed slots only moves the head. The capacity
+    grows when a plan or inserted slots need more room.
+
+    Indexes of slots that may have changed are collected in ``dirty`` until
+    they are taken with ``take_dirty``.
+    """
+
+    def __init__(self, capacity: int = SLOT_COUNT):
+        """Initialize an empty schedule."""
+        self.capacity = capacity
+        self.head = 0
+        self.starts = array("d", [math.nan]) * capacity
+        self.states = bytearray(capacity)
+        self.active = bytearray(capacity)
+        self.socs = bytearray([DEFAULT_SOC]) * capacity
+        self.dirty = set()
+
+    def __len__(self):
+        """Return the number of slots."""
+        return self.capacity
+
+    def _pos(self, index: int):
+        """Return the position in the arrays of slot index."""
+        if not 0 <= index < self.capacity:
+            raise IndexError(f"Slot index {index} out of range")
+        return (self.head + index) % self.capacity
+
+    def _touch(self, index: int):
+        """Return the position of slot index and mark it as dirty."""
+        position = self._pos(index)
+        self.dirty.add(index)
+        return position
+
+    def take_dirty(self):
+        """Return the indexes of changed slots and reset the tracking."""
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def reserve(self, size: int):
+        """Grow the arrays so that at least size slots fit."""
+        if size <= self.capacity:
+            return
+        self._linearize()
+        size = max(size, 2 * self.capacity)
+        extra = size - self.capacity
+        _LOGGER.debug("Growing slot schedule to %s slots", size)
+        self.starts.extend(array("d", [math.nan]) * extra)
+        self.states.extend(bytes(extra))
+        self.active.extend(bytes(extra))
+        self.socs.extend(bytes([DEFAULT_SOC]) * extra)
+        self.capacity = size
+
+    def _linearize(self):
+        """Rotate the arrays so that the head is at position 0."""
+        head = self.head
+        if head == 0:
+            return
+        for column in (self.starts, self.states, self.active, self.socs):
+            column[:] = column[head:] + column[:head]
+        self.head = 0
+
+    def start_epoch(self, index: int):
+        """Return the start of a slot as epoch seconds, or None if unset."""
+        if not 0 <= index < self.capacity:
+            return None
+        value = self.starts[(self.head + index) % self.capacity]
+        return None if math.isnan(value) else value
+
+    def get_start(self, index: int):
+        """Return the start of a slot as a datetime."""
+        return from_epoch(self.starts[self._pos(index)])
+
+    def set_start(self, index: int, value):
+        """Set the start of a slot from a datetime, epoch seconds or None."""
+        self.starts[self._touch(index)] = to_epoch(value)
+
+    def get_state(self, index: int):
+        """Return the state of a slot."""
+        return SLOT_STATES[self.states[self._pos(index)]]
+
+    def set_state(self, index: int, value):
+        """Set the state of a slot."""
+        self.states[self._touch(index)] = 0 if value is None else _STATE_CODES[value]
+
+    def get_active(self, index: int):
+        """Return whether a slot is active."""
+        return bool(self.active[self._pos(index)])
+
+    def set_active(self, index: int, value):
+        """Set whether a slot is active."""
+        self.active[self._touch(index)] = 1 if value else 0
+
+    def get_soc(self, index: int):
+        """Return the target SOC of a slot."""
+        return self.socs[self._pos(index)]
+
+    def set_soc(self, index: int, value):
+        """Set the target SOC of a slot."""
+        self.socs[self._touch(index)] = (
+            DEFAULT_SOC if value is None else max(0, min(100, round(float(value))))
+        )
+
+    def set_row(self, index: int, start, state, active, soc):
+        """Set all fields of a slot."""
+        self.set_start(index, start)
+        self.set_state(index, state)
+        self.set_active(index, active)
+        self.set_soc(index, soc)
+
+    def row(self, index: int):
+        """Return a slot as a dictionary."""
+        return {
+            "start": self.get_start(index),
+            "state": self.get_state(index),
+            "active": self.get_active(index),
+            "soc": self.get_soc(index),
+        }
+
+    def slice(self, start: int = 0, stop: int | None = None):
+        """Return the slots in [start, stop) as a list of dictionaries."""
+        return [self.row(i) for i in range(*slice(start, stop).indices(self.capacity))]
+
+    def clear(self, start: int = 0, stop: int | None = None):
+        """Reset the slots in [start, stop) to unset, off and inactive."""
+        start, stop, _ = slice(start, stop).indices(self.capacity)
+        if stop <= start:
+            return
+        if stop - start == self.capacity:
+            self.head = 0
+        self.dirty.update(range(start, stop))
+        self._clear_positions(self._pos(start), stop - start)
+
+    def _clear_positions(self, position: int, count: int):
+        """Reset count array entries from position, wrapping around the end."""
+        while count > 0:
+            stop = min(self.capacity, position + count)
+            size = stop - position
+            self.starts[position:stop] = array("d", [math.nan]) * size
+            self.states[position:stop] = bytes(size)
+            self.active[position:stop] = bytes(size)
+            self.socs[position:stop] = bytes([DEFAULT_SOC]) * size
+            count -= size
+            position = 0
+
+    def insert(self, index: int, count: int = 1):
+        """Insert count cleared slots at index, growing the schedule if needed."""
+        if count <= 0:
+            return
+        self.reserve(max(self.used(), index) + count)
+        self._linearize()
+        self.dirty.update(range(index, self.capacity))
+        keep = self.capacity - index - count
+        if keep > 0:
+            for column in (self.starts, self.states, self.active, self.socs):
+                column[index + count :] = column[index : index + keep]
+        self.clear(index, index + count)
+
+    def delete(self, index: int, count: int = 1):
+        """Remove count slots at index, moving later slots up."""
+        if count <= 0:
+            return
+        if index == 0:
+            self.advance(count)
+            return
+        self._linearize()
+        self.dirty.update(range(index, self.capacity))
+        keep = self.capacity - index - count
+        if keep > 0:
+            for column in (self.starts, self.states, self.active, self.socs):
+                column[index : index + keep] = column[index + count :]
+        self.clear(max(index, self.capacity - count))
+
+    def advance(self, count: int = 1):
+        """Drop the first count slots by moving the head."""
+        count = min(count, self.capacity)
+        if count <= 0:
+            return
+        # Every slot in use moves, the slots after them stay empty
+        self.dirty.update(range(self.used()))
+        # The dropped slots become the cleared tail of the schedule
+        self._clear_positions(self.head, count)
+        self.head = (self.head + count) % self.capacity
+
+    def first_off(self):
+        """Return the index of the first slot in state off."""
+        position = self.states.find(0, self.head)
+        if position >= 0:
+            return position - self.head
+        position = self.states.find(0, 0, self.head)
+        if position >= 0:
+            return position + self.capacity - self.head
+        return self.capacity
+
+    def bisect_start(self, epoch: float, lo: int = 0, right: bool = False):
+        """Return the index of the first slot from lo that is unset or >= epoch.
+
+        With right, return the first slot that is unset or > epoch instead.
+        Starts are expected to increase until the first unset slot.
+        """
+        hi = self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.starts[(self.head + mid) % self.capacity]
+            if math.isnan(start) or start > epoch or (not right and start == epoch):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def find_start(self, value):
+        """Return the index of the first slot that is unset or starts at/after value."""
+        return self.bisect_start(to_epoch(value))
+
+    def used(self):
+        """Return the number of slots that have a start."""
+        return self.bisect_start(math.inf)
+
+    def segments(self):
+        """Return the slots in use with their end, leaving out the final off slot."""
+        used = self.used()
+        segments = []
+        for i in range(used):
+            end = self.start_epoch(i + 1)
+            if end is None and self.get_state(i) == "off":
+                break
+            segments.append(
+                {
+                    "start": self.start_epoch(i),
+                    "end": end,
+                    "state": self.get_state(i),
+                    "soc": self.get_soc(i),
+                    "active": self.get_active(i),
+                }
+            )
+        return segments
+
+    def assign(self, index: int, schedule: list[dict]):
+        """Write a planned schedule from index, followed by an off slot at its end.
+
+        Each entry in schedule needs start, end, state and soc.
+        """
+        if len(schedule) == 0:
+            return
+        self.reserve(index + len(schedule) + 1)
+        for i, slot in enumerate(schedule, index):
+            self.set_row(i, slot["start"], slot["state"], True, slot["soc"])
+        end = index + len(schedule)
+        self.set_start(end, schedule[-1]["end"])
+        self.set_state(end, "off")
+        self.set_active(end, False)
+
+
+class SlotValues(MutableMapping):
+    """Dictionary view of the values store backed by a SlotSchedule.
+
+    Keys of the form ``slot_{i}_{field}`` (1-based) read and write the
+    first ``window`` slots of the schedule, the ones that have entities. Any
+    other key is kept in a plain dictionary. This keeps the entities and the
+    persisted "values" store working on the legacy keys.
+    """
+
+    def __init__(
+        self, slots: SlotSchedule, extra: dict | None = None, window=SLOT_COUNT
+    ):
+        """Initialize the view."""
+        self.slots = slots
+        self.extra = extra if extra is not None else {}
+        self.window = window
+        self._keys = {
+            f"slot_{i + 1}_{field}": (i, field)
+            for i in range(window)
+            for field in SLOT_FIELDS
+        }
+        self._getters = {
+            "date_time_start": slots.get_start,
+            "state": slots.get_state,
+            "active": slots.get_active,
+            "soc": slots.get_soc,
+        }
+        self._setters = {
+            "date_time_start": slots.set_start,
+            "state": slots.set_state,
+            "active": slots.set_active,
+            "soc": slots.set_soc,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict | None, window: int = SLOT_COUNT):
+        """Build a view from a dictionary with slot keys, as written by as_dict."""
+        values = cls(SlotSchedule(window), window=window)
+        slots = values.slots
+        for key, value in (data or {}).items():
+            match = _SLOT_KEY.fullmatch(key)
+            if match is None:
+                values.extra[key] = value
+                continue
+            index = int(match.group(1)) - 1
+            slots.reserve(index + 1)
+            values._setters[match.group(2)](index, value)
+        # Older versions could leave slots behind after the end of the schedule
+        for i in range(len(slots)):
+            if slots.start_epoch(i) is None:
+                slots.clear(i)
+                break
+        slots.take_dirty()
+        return values
+
+    def binding(self, key):
+        """Return (getter, setter, index) of a slot key, or None for other keys."""
+        slot = self._keys.get(key)
+        if slot is None:
+            return None
+        index, field = slot
+        return self._getters[field], self._setters[field], index
+
+    def as_dict(self):
+        """Return a plain dictionary with slot keys for storage.
+
+        Slot starts are epoch seconds, None if unset. Slots after the window
+        are included as long as they are in use.
+        """
+        slots = self.slots
+        data = {}
+        for i in range(max(self.window, slots.used())):
+            data[f"slot_{i + 1}_date_time_start"] = slots.start_epoch(i)
+            data[f"slot_{i + 1}_state"] = slots.get_state(i)
+            data[f"slot_{i + 1}_active"] = slots.get_active(i)
+            data[f"slot_{i + 1}_soc"] = slots.get_soc(i)
+        data.update(self.extra)
+        return data
+
+    def __getitem__(self, key):
+        """Return the value for key."""
+        slot = self._keys.get(key)
+        if slot is None:
+            return self.extra[key]
+        return self._getters[slot[1]](slot[0])
+
+    def __setitem__(self, key, value):
+        """Set the value for key."""
+        slot = self._keys.get(key)
+        if slot is None:
+            self.extra[key] = value
+            return
+        self._setters[slot[1]](slot[0], value)
+
+    def __delitem__(self, key):
+        """Remove key, slot keys are reset to their default."""
+        slot = self._keys.get(key)
+        if slot is None:
+            del self.extra[key]
+            return
+        self._setters[slot[1]](slot[0], None)
+
+    def __iter__(self):
+        """Iterate over slot keys followed by the other keys."""
+        yield from self._keys
+        yield from self.extra
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(self._keys) + len(self.extra)
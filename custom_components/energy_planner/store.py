@@ -1,11 +1,15 @@
+import hashlib
 import logging
+from collections.abc import Callable
 
-from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.json import JSONEncoder, json_bytes
 from homeassistant.helpers.storage import Store
 
 from custom_components.energy_planner.const import VERSION_STORAGE
+from custom_components.energy_planner.schema import migrate
 
 _LOGGER = logging.getLogger(__name__)
+SAVE_DELAY = 5
 
 
 def get_store_key(key):
@@ -13,11 +17,28 @@ def get_store_key(key):
     return key if "/" in key else f"energy_planner.{key}"
 
 
+class EnergyPlannerStore(Store):
+    """Store that migrates data of older versions with schema.migrate."""
+
+    def __init__(self, hass, key, encoder):
+        """Initialize the store."""
+        super().__init__(
+            hass,
+            VERSION_STORAGE,
+            get_store_key(key),
+            encoder=encoder,
+            atomic_writes=True,
+        )
+        self._data_key = key
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        """Migrate to the current version."""
+        return migrate(self._data_key, old_major_version, old_data)
+
+
 def _get_store_for_key(hass, key, encoder):
     """Create a Store object for the key."""
-    return Store(
-        hass, VERSION_STORAGE, get_store_key(key), encoder=encoder, atomic_writes=True
-    )
+    return EnergyPlannerStore(hass, key, encoder)
 
 
 def get_store_for_key(hass, key):
@@ -30,29 +51,72 @@ async def async_load_from_store(hass, key):
     return await get_store_for_key(hass, key).async_load() or {}
 
 
-async def async_save_to_store(hass, key, data):
-    """Generate dynamic data to store and save it to the filesystem.
-
-    The data is only written if the content on the disk has changed
-    by reading the existing content and comparing it.
-
-    If the data has changed this will generate two executor jobs
-
-    If the data has not changed this will generate one executor job
-    """
-    current = await async_load_from_store(hass, key)
-    if current is None or current != data:
-        await get_store_for_key(hass, key).async_save(data)
-        return
-    _LOGGER.debug(
-        "<HACSStore async_save_to_store> Did not store data for '%s'. "
-        "Content did not change",
-        get_store_key(key),
-    )
-
-
 async def async_remove_store(hass, key):
     """Remove a store element that should no longer be used."""
     if "/" not in key:
         return
     await get_store_for_key(hass, key).async_remove()
+
+
+def _digest(data):
+    """Return a digest of the JSON representation of data."""
+    return hashlib.blake2b(json_bytes(data), digest_size=16).digest()
+
+
+class StoreManager:
+    """Coalesce writes to the stores of the integration.
+
+    Changes are detected by comparing a digest of the data with the digest of
+    what was last loaded or written, so no disk reads are needed. A changed
+    store is written once after SAVE_DELAY seconds with the data at that
+    time, however many changes were made in between. Pending writes are
+    flushed by Home Assistant on shutdown, or with async_flush.
+    """
+
+    def __init__(self, hass, delay: float = SAVE_DELAY):
+        """Initialize the manager."""
+        self._hass = hass
+        self._delay = delay
+        self._stores = {}
+        self._digests = {}
+        self._pending = {}
+
+    def _get_store(self, key):
+        """Return the Store object for key, shared by all loads and saves."""
+        if key not in self._stores:
+            self._stores[key] = get_store_for_key(self._hass, key)
+        return self._stores[key]
+
+    async def async_load(self, key):
+        """Load the data for key and remember its digest."""
+        data = await self._get_store(key).async_load() or {}
+        self._digests[key] = _digest(data)
+        return data
+
+    def async_schedule_save(self, key, data_func: Callable):
+        """Schedule a write of data_func() for key if its content changed."""
+        if key in self._pending:
+            # The pending write reads the data when it runs
+            return
+        if _digest(data_func()) == self._digests.get(key):
+            _LOGGER.debug(
+                "Did not store data for '%s'. Content did not change",
+                get_store_key(key),
+            )
+            return
+        self._pending[key] = data_func
+        self._get_store(key).async_delay_save(
+            lambda: self._write_data(key, data_func), self._delay
+        )
+
+    def _write_data(self, key, data_func: Callable):
+        """Return the data to write for key and record its digest."""
+        self._pending.pop(key, None)
+        data = data_func()
+        self._digests[key] = _digest(data)
+        return data
+
+    async def async_flush(self):
+        """Write all pending changes now."""
+        for key, data_func in list(self._pending.items()):
+            await self._get_store(key).async_save(self._write_data(key, data_func))
@@ -6,6 +6,10 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from custom_components.energy_planner.const import DOMAIN, TIME_ENTITIES
+from custom_components.energy_planner.entity import (
+    EnergyPlannerEntity,
+    prepare_entities,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -40,62 +44,33 @@ async def async_setup_entry(
 
     hass.data[DOMAIN][TIME_ENTITIES] = times
 
-    for time in times:
-        if hass.data[DOMAIN][time.data_store].get(time.id) is None:
-            hass.data[DOMAIN][time.data_store][time.id] = time.native_value
+    prepare_entities(times)
     async_add_devices(times)
-    for time in times:
-        time.update()
     # Return boolean to indicate that initialization was successful
     return True
 
 
-class EnergyPlannerTimeEntity(TimeEntity):
-    """Representation of a Number entity."""
+class EnergyPlannerTimeEntity(EnergyPlannerEntity, TimeEntity):
+    """Representation of a Time entity."""
 
-    def __init__(self, hass, entity_definition):
-        """Initialize the Number entity."""
-        #
-        # Visible Instance Attributes Outside Class
-        self._hass = hass
-        self.id = entity_definition["id"]
+    platform_domain = "time"
 
-        self.entity_id = f"time.{DOMAIN}_{self.id}"
-        # Hidden Inherited Instance Attributes
-        self._attr_unique_id = "{}_{}".format(DOMAIN, self.id)
-        self._attr_has_entity_name = True
-        self._attr_name = entity_definition["name"]
-        self.data_store = entity_definition.get("data_store", "values")
+    def __init__(self, hass, entity_definition):
+        """Initialize the Time entity."""
+        super().__init__(hass, entity_definition)
         self._attr_native_value = entity_definition.get("default", None)
-        self._attr_assumed_state = entity_definition.get("assumed", False)
-        self._attr_available = True
-        self.is_added_to_hass = False
-        self._attr_device_class = entity_definition.get("device_class", None)
-        self._attr_icon = entity_definition.get("icon", None)
-        self._attr_native_step = entity_definition.get("step", 1.0)
-        self._attr_should_poll = False
-        self._attr_entity_registry_enabled_default = entity_definition.get(
-            "enabled", False
-        )
-
-    async def async_added_to_hass(self) -> None:
-        """Run when entity about to be added to hass."""
-        await super().async_added_to_hass()
-        self.is_added_to_hass = True
 
-    def update(self):
-        """Update Modbus data periodically."""
-        self._attr_available = True
-
-        value = self._hass.data[DOMAIN][self.data_store].get(self.id, None)
-        if type(value) is str:
-            value = dt.time.fromisoformat(value)
+    def refresh(self) -> bool:
+        """Read the stored value, return whether it changed."""
+        value = self.stored_value()
+        if value == self._attr_native_value:
+            return False
         self._attr_native_value = value
-        self.schedule_update_ha_state()
+        return True
 
     async def async_set_value(self, value: dt.time) -> None:
         """Update the current value."""
         self._attr_native_value = value
-        self._hass.data[DOMAIN][self.data_store][self.id] = value
+        self.store_value(value)
         await self._hass.data[DOMAIN]["save"]()
         self.schedule_update_ha_state()
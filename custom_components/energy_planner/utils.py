@@ -1,10 +1,37 @@
 import datetime as dt
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
+from homeassistant.util import dt as dt_utils
 
-def tz_diff(tz1, tz2):
-    """Return the difference in hours between tz1 and tz2 today."""
-    date = dt.datetime.now()
-    utc_offset_1 = date.astimezone(ZoneInfo(tz1)).utcoffset()
-    utc_offset_2 = date.astimezone(ZoneInfo(tz2)).utcoffset()
-    return (utc_offset_2 - utc_offset_1).total_seconds() / 3600
+# Timezone of the times given to the add_slot service
+LOCAL_ZONE = "Europe/Stockholm"
+
+_zones = {}
+
+
+def get_zone(name):
+    """Return the timezone called name, resolving it only the first time."""
+    zone = _zones.get(name)
+    if zone is None:
+        zone = _zones[name] = ZoneInfo(name)
+    return zone
+
+
+async def async_get_zone(name):
+    """Return the timezone called name, or None if unknown.
+
+    The first lookup of a zone is done outside the event loop.
+    """
+    zone = _zones.get(name)
+    if zone is None:
+        zone = await dt_utils.async_get_time_zone(name)
+        if zone is not None:
+            _zones[name] = zone
+    return zone
+
+
+@lru_cache(maxsize=64)
+def day_boundary(zone, date, hour=0, minute=0):
+    """Return the time hour:minute of date in zone, cached per date."""
+    return dt.datetime.combine(date, dt.time(hour, minute), zone)